@@ -15,24 +15,36 @@ BUSINESS CONTEXT:
 
 PIPELINE FLOW:
     
-    download_data → validate_source → perform_fifo_matching → 
-    validate_results → build_analytics → send_alerts
+    download_data → stage_source → validate_source → perform_fifo_matching
+    perform_fifo_matching → [validate_results, build_analytics]
+    [validate_source, validate_results, build_analytics] → alerts → end
+    
+    Source validation gates every step that writes output, so nothing is
+    matched or published from a source that failed its checks. Result
+    validation runs alongside analytics, so its time is off the critical
+    path.
     
     1. DOWNLOAD DATA: Fetch latest transaction data from source
-    2. VALIDATE SOURCE: Check data quality before processing
-    3. FIFO MATCHING: Match spent/expired to earned transactions
-    4. VALIDATE RESULTS: Verify matching is correct
-    5. BUILD ANALYTICS: Create reporting tables for finance team
-    6. SEND ALERTS: Notify team of completion or failures
+    2. STAGE SOURCE: Parse the workbook once into parquet for later tasks
+    3. VALIDATE SOURCE: Check data quality before processing
+    4. FIFO MATCHING: Match spent/expired to earned transactions
+    5. VALIDATE RESULTS: Verify matching is correct
+    6. BUILD ANALYTICS: Create reporting tables for finance team
+    7. ALERTS: Notify team via Slack, email and dashboard (in parallel)
 
 SCHEDULE:
     Runs daily at 6 AM UTC, but primary use is month-end close.
     Can also be triggered manually for ad-hoc processing.
 
 ERROR HANDLING:
-    - Each task has retry logic (3 retries with 5-minute delays)
+    - Each task has retry logic (3 retries, 30s exponential backoff capped at 5 min)
     - Failures trigger email alerts to the data team
-    - Validation failures stop the pipeline to prevent bad data
+    - Validation failures are reported through the alerts group and mark
+      the run failed (end requires every validation and analytics task to
+      succeed). A failed source validation stops the run before any output
+      is written. Analytics build in parallel with validate_results, so
+      their output may already be written when result validation fails;
+      only a successful run is signed off
 
 MONITORING:
     - Task durations are logged for performance tracking
@@ -45,8 +57,14 @@ DATE: 2024
 """
 
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+import hashlib
+import importlib.util
+import json
 import logging
+import os
+import shutil
+import sys
 
 # -----------------------------------------------------------------------------
 # AIRFLOW IMPORTS
@@ -54,8 +72,25 @@ import logging
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 from airflow.operators.empty import EmptyOperator
+from airflow.utils.task_group import TaskGroup
 from airflow.utils.trigger_rule import TriggerRule
 
+# -----------------------------------------------------------------------------
+# PROJECT MODULES
+# -----------------------------------------------------------------------------
+# The pipeline code lives in src/ next to dags/. Resolve it from this file
+# rather than the worker's working directory, and add it to sys.path once
+# when the DAG file is loaded instead of inside every task.
+#
+# The modules themselves (and pandas/pyarrow) are still imported inside
+# the tasks: the scheduler re-parses this file every few seconds, and
+# Airflow's guidance is to keep heavy imports out of DAG parsing. Each
+# task runs in its own process, so the in-task import happens once per
+# task either way.
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
 # -----------------------------------------------------------------------------
 # LOGGING CONFIGURATION
 # -----------------------------------------------------------------------------
@@ -81,11 +116,13 @@ DEFAULT_ARGS = {
     # RETRY CONFIGURATION
     # -------------------------------------------------------------------------
     # If a task fails, Airflow will retry it automatically.
-    # This handles transient issues like network timeouts.
+    # This handles transient issues like network timeouts, which usually
+    # clear within seconds - so start short and back off (30s, 60s, 120s)
+    # rather than stalling the run for half an hour.
     'retries': 3,  # Number of retry attempts
-    'retry_delay': timedelta(minutes=5),  # Wait between retries
-    'retry_exponential_backoff': True,  # Increase delay each retry
-    'max_retry_delay': timedelta(minutes=30),  # Cap on retry delay
+    'retry_delay': timedelta(seconds=30),  # Initial wait between retries
+    'retry_exponential_backoff': True,  # Double the delay each retry
+    'max_retry_delay': timedelta(minutes=5),  # Cap on retry delay
     
     # -------------------------------------------------------------------------
     # EXECUTION SETTINGS
@@ -105,6 +142,221 @@ DAG_CONFIG = {
     'tags': ['finance', 'thrive-cash', 'fifo', 'production'],
 }
 
+# Parsed Excel sheets are cached as parquet under this directory, keyed on
+# the SHA-256 of the source file together with everything that shapes the
+# staged output (see _source_cache_key). Retries and reruns on an
+# unchanged file read parquet instead of re-parsing the workbook.
+SOURCE_CACHE_DIR = 'data/.cache'
+SOURCE_SHEETS = ['TC_Data', 'Sales', 'Customers']
+
+# Column selection and dtypes for every reader in this DAG. Passing them
+# explicitly skips pandas' type-inference pass, stores TCTYPE as a compact
+# categorical instead of one Python string per row, and drops columns a
+# task never looks at. ID columns are left to inference on the raw read so
+# that null IDs surface as source-validation errors rather than a parse
+# failure. Intermediate files are parquet or feather, so later reads keep
+# these dtypes (and datetime64 columns) without any re-parsing.
+TC_USECOLS = [
+    'TRANS_ID', 'TCTYPE', 'CREATEDAT', 'EXPIREDAT',
+    'CUSTOMERID', 'ORDERID', 'AMOUNT', 'REASON',
+]
+TC_DTYPES = {'AMOUNT': 'float64', 'TCTYPE': 'category'}
+VALIDATION_COLUMNS = ['TRANS_ID', 'TCTYPE', 'CREATEDAT', 'CUSTOMERID', 'AMOUNT', 'REDEEMID']
+ANALYTICS_COLUMNS = ['CUSTOMERID', 'CREATEDAT', 'TRANS_ID', 'TCTYPE', 'AMOUNT']
+SHEET_READ_OPTIONS = {
+    'TC_Data': {'usecols': TC_USECOLS, 'dtype': TC_DTYPES},
+}
+
+# Bump whenever the staging code changes what it writes, so existing
+# cache entries are not reused.
+STAGING_FORMAT_VERSION = 1
+
+# Above this size, when the calamine engine is not installed, sheets are
+# streamed row by row through openpyxl's read-only mode and written to
+# parquet in chunks, so peak memory no longer scales with the workbook.
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+STREAMING_CHUNK_ROWS = 50_000
+
+# build_analytics computes and writes running balances this many customers
+# at a time, so its peak memory is bounded by the chunk, not the dataset.
+ANALYTICS_CUSTOMERS_PER_CHUNK = 10_000
+
+# Airflow pool for the CPU-heavy tasks. Branches run in parallel, so a
+# dedicated pool can cap how many of them compete for a worker at once.
+# It is opt-in: unset, the tasks use Airflow's built-in default_pool, which
+# every installation has. To enable it, create the pool and point the
+# environment variable at it:
+#   airflow pools set cpu_pool 4 "Thrive Cash CPU-bound tasks"
+#   export THRIVE_CASH_CPU_POOL=cpu_pool
+CPU_POOL = os.environ.get('THRIVE_CASH_CPU_POOL', 'default_pool')
+
+
+# =============================================================================
+# HELPER FUNCTIONS
+# =============================================================================
+
+
+def _file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the hex SHA-256 of a file, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_cache_key(source_path: str, reader: str) -> str:
+    """
+    Return the cache key for staging source_path with the given reader.
+    
+    Hashes the file contents with SHEET_READ_OPTIONS, the staging reader
+    and STAGING_FORMAT_VERSION, so a change to any of them stages afresh
+    instead of reusing parquet written under the old settings.
+    """
+    settings = json.dumps({
+        'version': STAGING_FORMAT_VERSION,
+        'reader': reader,
+        'read_options': SHEET_READ_OPTIONS,
+    }, sort_keys=True)
+    digest = hashlib.sha256(_file_sha256(source_path).encode())
+    digest.update(settings.encode())
+    return digest.hexdigest()[:16]
+
+
+def _prune_source_cache(keep_dir: str) -> None:
+    """Remove every cache entry under SOURCE_CACHE_DIR except keep_dir."""
+    for entry in os.listdir(SOURCE_CACHE_DIR):
+        path = os.path.join(SOURCE_CACHE_DIR, entry)
+        if os.path.isdir(path) and os.path.abspath(path) != os.path.abspath(keep_dir):
+            logger.info(f"Pruning stale source cache: {path}")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _stage_sheets(source_path: str, sheet_names: List[str]) -> Tuple[str, Dict[str, str]]:
+    """
+    Convert workbook sheets to parquet once, using a content-hashed cache.
+    
+    The cache directory is SOURCE_CACHE_DIR/<_source_cache_key>, which
+    covers the file contents, the read options, the reader and the staging
+    format version. On a hit nothing is read at all; on a miss every sheet
+    is parsed and written to <cache_dir>/<sheet>.parquet (zstd) by the
+    fastest reader available: polars + calamine, then pandas + calamine,
+    with openpyxl read-only streaming for very large files when calamine
+    is missing. Files are written to a temporary name first so a crashed
+    task never leaves a truncated cache entry, and once every sheet is
+    staged the older cache entries are deleted.
+    
+    RETURNS:
+        Tuple of (cache_dir, {sheet_name: parquet_path})
+    """
+    from fifo_matching import open_workbook
+    
+    if _polars_calamine_available():
+        reader = 'polars'
+    elif (importlib.util.find_spec('python_calamine') is None
+            and os.path.getsize(source_path) > STREAMING_THRESHOLD_BYTES):
+        reader = 'openpyxl_stream'
+    else:
+        reader = 'pandas'
+    
+    cache_dir = os.path.join(SOURCE_CACHE_DIR, _source_cache_key(source_path, reader))
+    cache_paths = {name: os.path.join(cache_dir, f'{name}.parquet') for name in sheet_names}
+    
+    if all(os.path.exists(path) for path in cache_paths.values()):
+        logger.info(f"Source cache hit: {cache_dir}")
+        return cache_dir, cache_paths
+    
+    logger.info(f"Source cache miss, parsing workbook with {reader} into: {cache_dir}")
+    os.makedirs(cache_dir, exist_ok=True)
+    
+    if reader == 'polars':
+        for name in sheet_names:
+            _stage_sheet_polars(source_path, name, cache_paths[name])
+    elif reader == 'openpyxl_stream':
+        for name in sheet_names:
+            _stream_sheet_to_parquet(source_path, name, cache_paths[name])
+    else:
+        with open_workbook(source_path) as xl:
+            for name in sheet_names:
+                sheet_df = xl.parse(name, **SHEET_READ_OPTIONS.get(name, {}))
+                tmp_path = cache_paths[name] + '.tmp'
+                sheet_df.to_parquet(tmp_path, compression='zstd', index=False)
+                os.replace(tmp_path, cache_paths[name])
+    
+    _prune_source_cache(keep_dir=cache_dir)
+    
+    return cache_dir, cache_paths
+
+
+def _polars_calamine_available() -> bool:
+    """True when polars and its fastexcel (calamine) reader are installed."""
+    return all(importlib.util.find_spec(mod) is not None for mod in ('polars', 'fastexcel'))
+
+
+def _stage_sheet_polars(source_path: str, sheet_name: str, out_path: str) -> None:
+    """
+    Write one sheet to parquet with polars' calamine reader.
+    
+    The sheet goes straight from the multithreaded native parser to parquet
+    without ever becoming a pandas DataFrame. SHEET_READ_OPTIONS is applied
+    as a column selection plus casts, and values are normalised the way
+    pandas reads them (blank strings as nulls, sorted categories,
+    microsecond datetimes) so the staged files are identical either way.
+    """
+    import polars as pl
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    options = SHEET_READ_OPTIONS.get(sheet_name, {})
+    sheet_df = pl.read_excel(
+        source_path, sheet_name=sheet_name, engine='calamine',
+        columns=options.get('usecols'),
+    )
+    sheet_df = sheet_df.with_columns(
+        pl.col(pl.String).replace('', None),
+        pl.col(pl.Datetime).dt.cast_time_unit('us'),
+    )
+    
+    casts = []
+    for col, dtype in options.get('dtype', {}).items():
+        if dtype == 'category':
+            categories = sorted(sheet_df[col].drop_nulls().unique().to_list())
+            casts.append(pl.col(col).cast(pl.Enum(categories)))
+        else:
+            casts.append(pl.col(col).cast(getattr(pl, dtype.capitalize())))
+    table = sheet_df.with_columns(casts).to_arrow()
+    
+    # polars Enums are written as ordered dictionaries; pandas categoricals
+    # from the other readers are unordered
+    table = table.cast(pa.schema([
+        field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        if pa.types.is_dictionary(field.type) else field
+        for field in table.schema
+    ]))
+    
+    tmp_path = out_path + '.tmp'
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, out_path)
+
+
+def _stream_sheet_to_parquet(source_path: str, sheet_name: str, out_path: str) -> None:
+    """
+    Write one sheet to parquet chunk by chunk via openpyxl read-only mode.
+    
+    Each chunk becomes a parquet row group. TC_Data is written with its
+    fixed Arrow schema, so columns that are empty in the first chunk keep
+    their real types; other sheets use the types inferred from their data.
+    """
+    from fifo_matching import iter_sheet_chunks, tc_data_arrow_schema, write_parquet_chunks
+    
+    logger.info(f"Streaming {sheet_name} with openpyxl read-only mode")
+    
+    schema = tc_data_arrow_schema(TC_USECOLS) if sheet_name == 'TC_Data' else None
+    chunks = iter_sheet_chunks(source_path, sheet_name,
+                               chunk_size=STREAMING_CHUNK_ROWS,
+                               **SHEET_READ_OPTIONS.get(sheet_name, {}))
+    write_parquet_chunks(chunks, out_path, schema=schema)
+
 
 # =============================================================================
 # TASK FUNCTIONS
@@ -134,46 +386,36 @@ def download_data(**context) -> Dict[str, Any]:
     2. Query the TC_DATA, SALES, and CUSTOMERS tables
     3. Save results to a staging location (S3 or local)
     
-    For this assessment, we're reading from a local Excel file.
+    For this assessment, the source is a local Excel file. Parsing it is
+    left to stage_source so the workbook is only ever parsed once.
     
     PARAMETERS:
         **context: Airflow context with execution date, task instance, etc.
     
     RETURNS:
-        Dict with file paths and row counts for downstream tasks
+        Dict with the source file path for downstream tasks
     
     XCOM:
-        Pushes 'source_file_path' and 'row_count' for downstream tasks
+        Pushes 'source_file_path' and 'source_size_bytes'
     """
-    import pandas as pd
-    
     logger.info("=" * 60)
     logger.info("TASK: download_data")
     logger.info("=" * 60)
     
     # In production, this would be a Snowflake query
-    # For assessment, we read from the Excel file
+    # For assessment, we use the Excel file
     source_path = 'data/tc_raw_data.xlsx'
     
-    logger.info(f"Reading data from: {source_path}")
-    
-    # Load all sheets
-    tc_data = pd.read_excel(source_path, sheet_name='TC_Data')
-    sales = pd.read_excel(source_path, sheet_name='Sales')
-    customers = pd.read_excel(source_path, sheet_name='Customers')
-    
-    # Log summary statistics
-    logger.info(f"TC_Data: {len(tc_data)} rows")
-    logger.info(f"Sales: {len(sales)} rows")
-    logger.info(f"Customers: {len(customers)} rows")
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Source file not found: {source_path}")
     
     # Store metadata for downstream tasks using XCom
-    # XCom is Airflow's way of passing data between tasks
+    # XCom is Airflow's way of passing data between tasks. XCom values live
+    # in the Airflow metadata DB, so tasks only ever push file paths and
+    # small counters - bulk data stays in files that the paths point to.
     result = {
         'source_file_path': source_path,
-        'tc_data_rows': len(tc_data),
-        'sales_rows': len(sales),
-        'customers_rows': len(customers),
+        'source_size_bytes': os.path.getsize(source_path),
         'execution_date': str(context['execution_date'])
     }
     
@@ -182,9 +424,76 @@ def download_data(**context) -> Dict[str, Any]:
     return result
 
 
+def stage_source(**context) -> Dict[str, Any]:
+    """
+    TASK 2: Convert the source workbook to parquet for every later task.
+    
+    ==========================================================================
+    WHAT THIS DOES (for non-technical readers):
+    ==========================================================================
+    
+    Reading a spreadsheet is by far the slowest step of loading the data.
+    This task reads it exactly once and saves a fast, compact copy of each
+    sheet that all the following tasks use instead.
+    
+    ==========================================================================
+    TECHNICAL DETAILS:
+    ==========================================================================
+    
+    Each sheet is written to parquet in a cache directory keyed on the
+    source file's SHA-256 and the staging settings (see _stage_sheets), so
+    a retry or rerun on an unchanged file skips the Excel parse entirely. Row counts come from
+    the parquet footers - the data itself is never loaded here.
+    
+    PARAMETERS:
+        **context: Airflow context
+    
+    RETURNS:
+        Dict with parquet paths and row counts for downstream tasks
+    
+    XCOM:
+        Pushes 'source_cache_dir' (parquet copies of each sheet),
+        'tc_data_path' (the staged TC_Data parquet that every downstream
+        task reads instead of the xlsx) and row counts
+    """
+    import pyarrow.parquet as pq
+    
+    logger.info("=" * 60)
+    logger.info("TASK: stage_source")
+    logger.info("=" * 60)
+    
+    ti = context['ti']
+    download_result = ti.xcom_pull(task_ids='download_data')
+    source_path = download_result['source_file_path']
+    
+    logger.info(f"Staging data from: {source_path}")
+    
+    cache_dir, sheet_paths = _stage_sheets(source_path, SOURCE_SHEETS)
+    row_counts = {
+        name: pq.ParquetFile(path).metadata.num_rows
+        for name, path in sheet_paths.items()
+    }
+    
+    # Log summary statistics
+    for name, rows in row_counts.items():
+        logger.info(f"{name}: {rows} rows")
+    
+    result = {
+        'source_cache_dir': cache_dir,
+        'tc_data_path': sheet_paths['TC_Data'],
+        'tc_data_rows': row_counts['TC_Data'],
+        'sales_rows': row_counts['Sales'],
+        'customers_rows': row_counts['Customers'],
+    }
+    
+    logger.info(f"Staging complete: {result}")
+    
+    return result
+
+
 def validate_source(**context) -> Dict[str, Any]:
     """
-    TASK 2: Validate source data quality before processing.
+    TASK 3: Validate source data quality before processing.
     
     ==========================================================================
     WHAT THIS DOES (for non-technical readers):
@@ -194,8 +503,9 @@ def validate_source(**context) -> Dict[str, Any]:
     This is like proofreading a document before publishing - we want to
     catch errors early before they cause bigger problems.
     
-    If validation fails, the pipeline STOPS here to prevent bad data
-    from being processed.
+    If validation fails, FIFO matching, result validation and analytics
+    do not run, nothing is written to output/, and the DAG run is marked
+    failed.
     
     ==========================================================================
     CHECKS PERFORMED:
@@ -216,9 +526,6 @@ def validate_source(**context) -> Dict[str, Any]:
     RAISES:
         ValueError: If critical validation checks fail
     """
-    import pandas as pd
-    import sys
-    sys.path.insert(0, 'src')
     from data_quality import validate_source_data, validation_gate
     from fifo_matching import load_tc_data
     
@@ -226,15 +533,15 @@ def validate_source(**context) -> Dict[str, Any]:
     logger.info("TASK: validate_source")
     logger.info("=" * 60)
     
-    # Get file path from previous task
+    # Get the staged parquet path from the previous task
     ti = context['ti']
-    download_result = ti.xcom_pull(task_ids='download_data')
-    source_path = download_result['source_file_path']
+    stage_result = ti.xcom_pull(task_ids='stage_source')
+    tc_data_path = stage_result['tc_data_path']
     
-    logger.info(f"Validating data from: {source_path}")
+    logger.info(f"Validating data from: {tc_data_path}")
     
     # Load and validate
-    df = load_tc_data(source_path)
+    df = load_tc_data(tc_data_path)
     report = validate_source_data(df)
     
     # Log the validation report
@@ -253,7 +560,7 @@ def validate_source(**context) -> Dict[str, Any]:
 
 def perform_fifo_matching(**context) -> Dict[str, Any]:
     """
-    TASK 3: Execute the FIFO matching algorithm.
+    TASK 4: Execute the FIFO matching algorithm.
     
     ==========================================================================
     WHAT THIS DOES (for non-technical readers):
@@ -270,9 +577,10 @@ def perform_fifo_matching(**context) -> Dict[str, Any]:
     TECHNICAL DETAILS:
     ==========================================================================
     
-    1. Load validated source data
-    2. For each customer, sort earned transactions by date
-    3. Match spent/expired to oldest available earned
+    1. Load source data (validate_source has already passed)
+    2. Sort all rows once by customer, type and date
+    3. Match spent/expired to oldest available earned (compiled kernel,
+       customers in parallel)
     4. Add REDEEMID column to track the matching
     5. Save results to output file
     
@@ -282,51 +590,45 @@ def perform_fifo_matching(**context) -> Dict[str, Any]:
     RETURNS:
         Dict with output file path and matching statistics
     """
-    import sys
-    sys.path.insert(0, 'src')
     from fifo_matching import run_fifo_matching_pipeline
     
     logger.info("=" * 60)
     logger.info("TASK: perform_fifo_matching")
     logger.info("=" * 60)
     
-    # Get file path from download task
+    # Get the staged parquet path from the staging task
     ti = context['ti']
-    download_result = ti.xcom_pull(task_ids='download_data')
-    source_path = download_result['source_file_path']
+    stage_result = ti.xcom_pull(task_ids='stage_source')
+    source_path = stage_result['tc_data_path']
     
     # Define output path with execution date for versioning
     execution_date = context['execution_date'].strftime('%Y%m%d')
-    output_path = f'output/tc_data_with_redemptions_{execution_date}.csv'
+    # Feather (Arrow IPC): validate_results and build_analytics both
+    # memory-map it and read only the columns they need
+    output_path = f'output/tc_data_with_redemptions_{execution_date}.feather'
     
     logger.info(f"Input: {source_path}")
     logger.info(f"Output: {output_path}")
     
-    # Run the FIFO matching pipeline
-    result_df = run_fifo_matching_pipeline(
+    # Run the FIFO matching pipeline - statistics are counted during
+    # matching, so the result is not scanned again here
+    _, stats = run_fifo_matching_pipeline(
         input_path=source_path,
         output_path=output_path
     )
     
-    # Calculate statistics
-    total_earned = len(result_df[result_df['TCTYPE'] == 'earned'])
-    matched_earned = len(result_df[
-        (result_df['TCTYPE'] == 'earned') & 
-        (result_df['REDEEMID'].notna())
-    ])
-    
     return {
         'output_path': output_path,
-        'total_transactions': len(result_df),
-        'total_earned': total_earned,
-        'matched_earned': matched_earned,
-        'match_rate': f"{(matched_earned/total_earned*100):.1f}%" if total_earned > 0 else "N/A"
+        'total_transactions': stats['total_transactions'],
+        'total_earned': stats['total_earned'],
+        'matched_earned': stats['matched_earned'],
+        'match_rate': stats['match_rate']
     }
 
 
 def validate_results(**context) -> Dict[str, Any]:
     """
-    TASK 4: Validate FIFO matching results.
+    TASK 5: Validate FIFO matching results.
     
     ==========================================================================
     WHAT THIS DOES (for non-technical readers):
@@ -351,11 +653,8 @@ def validate_results(**context) -> Dict[str, Any]:
     RETURNS:
         Dict with validation results
     """
-    import pandas as pd
-    import sys
-    sys.path.insert(0, 'src')
+    from pyarrow import feather
     from data_quality import validate_fifo_results, validation_gate
-    from fifo_matching import load_tc_data
     
     logger.info("=" * 60)
     logger.info("TASK: validate_results")
@@ -363,22 +662,18 @@ def validate_results(**context) -> Dict[str, Any]:
     
     ti = context['ti']
     
-    # Get paths from previous tasks
-    download_result = ti.xcom_pull(task_ids='download_data')
+    # Get the output path from the matching task
     fifo_result = ti.xcom_pull(task_ids='perform_fifo_matching')
-    
-    source_path = download_result['source_file_path']
     output_path = fifo_result['output_path']
     
     logger.info(f"Validating FIFO results: {output_path}")
     
-    # Load original and matched data
-    original_df = load_tc_data(source_path)
-    matched_df = pd.read_csv(output_path)
-    matched_df['CREATEDAT'] = pd.to_datetime(matched_df['CREATEDAT'])
+    # Every post-FIFO check runs on the matched output alone, so only the
+    # columns they use are read and the original TC data is never loaded
+    matched_df = feather.read_table(output_path, columns=VALIDATION_COLUMNS, memory_map=True).to_pandas()
     
     # Run validation
-    report = validate_fifo_results(original_df, matched_df)
+    report = validate_fifo_results(original_df=None, matched_df=matched_df)
     
     # Log the report
     logger.info(report.summary())
@@ -395,7 +690,7 @@ def validate_results(**context) -> Dict[str, Any]:
 
 def build_analytics(**context) -> Dict[str, Any]:
     """
-    TASK 5: Build analytics tables for the finance team.
+    TASK 6: Build analytics tables for the finance team.
     
     ==========================================================================
     WHAT THIS DOES (for non-technical readers):
@@ -414,7 +709,9 @@ def build_analytics(**context) -> Dict[str, Any]:
     ==========================================================================
     
     Creates the following analytics outputs:
-    1. customer_balances.csv - Running balance for each customer
+    1. customer_balances_YYYYMMDD.parquet - Running balance for each customer
+       (zstd-compressed parquet: typed, columnar and far smaller/faster
+       to write and re-read than CSV)
     2. Summary statistics for the period
     
     In production, these would be written to Snowflake tables.
@@ -425,7 +722,12 @@ def build_analytics(**context) -> Dict[str, Any]:
     RETURNS:
         Dict with analytics output paths
     """
+    import numpy as np
     import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from pyarrow import feather
+    from run_analytics import build_customer_balance_history
     
     logger.info("=" * 60)
     logger.info("TASK: build_analytics")
@@ -436,108 +738,85 @@ def build_analytics(**context) -> Dict[str, Any]:
     output_path = fifo_result['output_path']
     
     # Load matched data
-    df = pd.read_csv(output_path)
-    df['CREATEDAT'] = pd.to_datetime(df['CREATEDAT'])
+    df = feather.read_table(output_path, columns=ANALYTICS_COLUMNS, memory_map=True).to_pandas()
     
     logger.info("Building customer balance analytics...")
     
     # ---------------------------------------------------------------------
     # BUILD CUSTOMER BALANCES OVER TIME
     # ---------------------------------------------------------------------
-    # This creates a running total of earned, spent, expired for each customer
-    
-    balance_records = []
-    
-    for customer_id in df['CUSTOMERID'].unique():
-        customer_df = df[df['CUSTOMERID'] == customer_id].sort_values('CREATEDAT')
-        
-        cumulative_earned = 0
-        cumulative_spent = 0
-        cumulative_expired = 0
-        
-        for _, row in customer_df.iterrows():
-            if row['TCTYPE'] == 'earned':
-                cumulative_earned += row['AMOUNT']
-            elif row['TCTYPE'] == 'spent':
-                cumulative_spent += abs(row['AMOUNT'])
-            elif row['TCTYPE'] == 'expired':
-                cumulative_expired += abs(row['AMOUNT'])
-            
-            balance_records.append({
-                'customer_id': customer_id,
-                'transaction_date': row['CREATEDAT'],
-                'transaction_id': row['TRANS_ID'],
-                'transaction_type': row['TCTYPE'],
-                'amount': row['AMOUNT'],
-                'cumulative_earned': cumulative_earned,
-                'cumulative_spent': cumulative_spent,
-                'cumulative_expired': cumulative_expired,
-                'current_balance': cumulative_earned - cumulative_spent - cumulative_expired
-            })
-    
-    balance_df = pd.DataFrame(balance_records)
+    # This creates a running total of earned, spent, expired for each customer,
+    # using the same build_customer_balance_history() as run_analytics.py so
+    # the two outputs can't drift apart. Rows are ordered by customer (in
+    # order of first appearance) and then by date; rows without a customer
+    # are left out, as build_customer_balance_history() does.
+    #
+    # The output is built ANALYTICS_CUSTOMERS_PER_CHUNK customers at a time
+    # and each block is appended to the parquet file as its own row group,
+    # so the derived columns never exist for the whole dataset at once.
+    # Every block holds whole customers, so its running totals are final.
+    
+    customer_order = pd.factorize(df['CUSTOMERID'])[0]
+    df = (
+        df[customer_order >= 0]
+        .assign(_customer_order=customer_order[customer_order >= 0])
+        .sort_values(['_customer_order', 'CREATEDAT'], kind='stable')
+        .reset_index(drop=True)
+    )
+    
+    # Row offsets where each block of customers starts (rows are sorted by
+    # customer order, so every block is one contiguous slice)
+    chunk_ids = df['_customer_order'].to_numpy() // ANALYTICS_CUSTOMERS_PER_CHUNK
+    boundaries = np.flatnonzero(np.diff(chunk_ids)) + 1
+    starts = np.concatenate(([0], boundaries)) if len(df) else np.array([], dtype=int)
+    ends = np.concatenate((boundaries, [len(df)])) if len(df) else np.array([], dtype=int)
     
     # Save analytics output
     execution_date = context['execution_date'].strftime('%Y%m%d')
-    analytics_path = f'output/customer_balances_{execution_date}.csv'
-    balance_df.to_csv(analytics_path, index=False)
-    
-    logger.info(f"Analytics saved to: {analytics_path}")
-    logger.info(f"Total records: {len(balance_df)}")
+    analytics_path = f'output/customer_balances_{execution_date}.parquet'
+    
+    writer = None
+    try:
+        for start, end in zip(starts, ends):
+            table = pa.Table.from_pandas(
+                build_customer_balance_history(df.iloc[start:end]), preserve_index=False
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(analytics_path, table.schema, compression='zstd')
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    if writer is None:
+        build_customer_balance_history(df).to_parquet(analytics_path, compression='zstd', index=False)
+    
+    logger.info(f"Analytics saved to: {analytics_path} ({len(starts)} chunk(s))")
+    logger.info(f"Total records: {len(df)}")
     
     return {
         'analytics_path': analytics_path,
-        'total_records': len(balance_df),
-        'unique_customers': balance_df['customer_id'].nunique()
+        'total_records': len(df),
+        'unique_customers': df['CUSTOMERID'].nunique()
     }
 
 
-def send_alerts(**context) -> Dict[str, Any]:
+def _build_run_summary(context) -> str:
     """
-    TASK 6: Send completion alerts and summary report.
-    
-    ==========================================================================
-    WHAT THIS DOES (for non-technical readers):
-    ==========================================================================
+    Build the end-of-run summary message shared by all the alert tasks.
     
-    When the pipeline finishes (successfully or with errors), this task
-    sends notifications to the team. This includes:
-    
-    - Success: Summary of what was processed
-    - Failure: Details about what went wrong
-    - Anomalies: Warnings about unusual patterns
-    
-    ==========================================================================
-    TECHNICAL DETAILS:
-    ==========================================================================
-    
-    In production, this would:
-    1. Send Slack messages to #data-alerts channel
-    2. Send email summary to finance team
-    3. Update monitoring dashboard
-    4. Log metrics to observability platform
-    
-    PARAMETERS:
-        **context: Airflow context
-    
-    RETURNS:
-        Dict with alert status
+    Pulls the small XCom results of the upstream tasks; any task that
+    failed or was skipped simply shows as N/A or FAILED.
     """
-    logger.info("=" * 60)
-    logger.info("TASK: send_alerts")
-    logger.info("=" * 60)
-    
     ti = context['ti']
     
     # Gather results from all tasks
-    download_result = ti.xcom_pull(task_ids='download_data') or {}
     source_validation = ti.xcom_pull(task_ids='validate_source') or {}
     fifo_result = ti.xcom_pull(task_ids='perform_fifo_matching') or {}
     results_validation = ti.xcom_pull(task_ids='validate_results') or {}
     analytics_result = ti.xcom_pull(task_ids='build_analytics') or {}
     
-    # Build summary message
-    summary = f"""
+    return f"""
     ============================================================
     THRIVE CASH PROCESSING COMPLETE
     ============================================================
@@ -558,17 +837,81 @@ def send_alerts(**context) -> Dict[str, Any]:
     - Analytics: {analytics_result.get('analytics_path', 'N/A')}
     ============================================================
     """
+
+
+def send_slack_alert(**context) -> Dict[str, Any]:
+    """
+    TASK 7a: Post the run summary to the #data-alerts Slack channel.
+    
+    ==========================================================================
+    WHAT THIS DOES (for non-technical readers):
+    ==========================================================================
     
+    When the pipeline finishes (successfully or with errors), the team is
+    notified in three ways at once - Slack, email and the monitoring
+    dashboard. Each is its own small task, so a slow email server never
+    holds up the Slack message, and one channel failing doesn't stop the
+    others.
+    
+    PARAMETERS:
+        **context: Airflow context
+    
+    RETURNS:
+        Dict with alert status only - the summary is logged, not pushed
+        to XCom
+    """
+    logger.info("TASK: alerts.send_slack")
+    
+    summary = _build_run_summary(context)
     logger.info(summary)
     
-    # In production, send to Slack/email here
+    # In production:
     # slack_client.send_message(channel='#data-alerts', text=summary)
+    
+    return {'alert_sent': True}
+
+
+def send_email_alert(**context) -> Dict[str, Any]:
+    """
+    TASK 7b: Email the run summary to the finance team.
+    
+    PARAMETERS:
+        **context: Airflow context
+    
+    RETURNS:
+        Dict with alert status only
+    """
+    logger.info("TASK: alerts.send_email")
+    
+    summary = _build_run_summary(context)
+    
+    # In production:
     # email_client.send(to='finance-team@thrivemarket.com', subject='TC Processing Complete', body=summary)
+    logger.info(f"Email summary prepared ({len(summary)} chars)")
     
-    return {
-        'alert_sent': True,
-        'summary': summary
-    }
+    return {'alert_sent': True}
+
+
+def update_dashboard(**context) -> Dict[str, Any]:
+    """
+    TASK 7c: Push run metrics to the monitoring dashboard.
+    
+    PARAMETERS:
+        **context: Airflow context
+    
+    RETURNS:
+        Dict with update status only
+    """
+    logger.info("TASK: alerts.update_dashboard")
+    
+    ti = context['ti']
+    fifo_result = ti.xcom_pull(task_ids='perform_fifo_matching') or {}
+    
+    # In production:
+    # metrics_client.gauge('thrive_cash.match_rate', fifo_result.get('match_rate'))
+    logger.info(f"Dashboard metrics: match_rate={fifo_result.get('match_rate', 'N/A')}")
+    
+    return {'dashboard_updated': True}
 
 
 def handle_failure(context):
@@ -641,63 +984,89 @@ with DAG(
         """
     )
     
-    # Task 2: Validate source data
+    # Task 2: Stage source as parquet
+    stage_source_task = PythonOperator(
+        task_id='stage_source',
+        python_callable=stage_source,
+        pool=CPU_POOL,
+        doc="""
+        Parses the source workbook once into per-sheet parquet files
+        (content-hashed cache). All later tasks read the parquet copies.
+        """
+    )
+    
+    # Task 3: Validate source data
     validate_source_task = PythonOperator(
         task_id='validate_source',
         python_callable=validate_source,
+        pool=CPU_POOL,
         doc="""
         Validates source data quality before processing.
         Checks for nulls, valid types, correct signs, duplicates.
-        Pipeline stops here if validation fails.
+        A failure blocks matching and analytics and fails the run.
         """
     )
     
-    # Task 3: Perform FIFO matching
+    # Task 4: Perform FIFO matching
     fifo_matching_task = PythonOperator(
         task_id='perform_fifo_matching',
         python_callable=perform_fifo_matching,
+        pool=CPU_POOL,
+        # Expensive task - retry less often and wait longer between attempts
+        retries=2,
+        retry_delay=timedelta(minutes=2),
         doc="""
         Core business logic: matches spent/expired transactions to
         earned transactions using FIFO (First-In, First-Out) rules.
         """
     )
     
-    # Task 4: Validate results
+    # Task 5: Validate results
     validate_results_task = PythonOperator(
         task_id='validate_results',
         python_callable=validate_results,
+        pool=CPU_POOL,
         doc="""
         Validates FIFO matching results for correctness.
         Checks chronological order, balance reconciliation, etc.
         """
     )
     
-    # Task 5: Build analytics
+    # Task 6: Build analytics
     build_analytics_task = PythonOperator(
         task_id='build_analytics',
         python_callable=build_analytics,
+        pool=CPU_POOL,
         doc="""
         Creates analytics tables for the finance team.
         Includes customer balances over time and summary statistics.
         """
     )
     
-    # Task 6: Send alerts
-    send_alerts_task = PythonOperator(
-        task_id='send_alerts',
-        python_callable=send_alerts,
-        trigger_rule=TriggerRule.ALL_DONE,  # Run even if upstream fails
-        doc="""
-        Sends completion notifications to the team.
-        Runs regardless of upstream success/failure to ensure alerts are sent.
-        """
-    )
+    # Task 7: Send alerts
+    # Slack, email and dashboard are independent, so they run in parallel
+    # inside one group. Each runs even if upstream tasks fail, so that
+    # failures are reported.
+    with TaskGroup(group_id='alerts', tooltip='Completion notifications') as alerts_group:
+        for alert_id, alert_callable in [
+            ('send_slack', send_slack_alert),
+            ('send_email', send_email_alert),
+            ('update_dashboard', update_dashboard),
+        ]:
+            PythonOperator(
+                task_id=alert_id,
+                python_callable=alert_callable,
+                trigger_rule=TriggerRule.ALL_DONE,  # Run even if upstream fails
+            )
     
     # End marker
+    # The only leaf, so its state decides the run's state. It waits for the
+    # alerts but requires the validation and analytics tasks to succeed, so
+    # a failed validation marks the run failed after the alerts have gone out.
     end = EmptyOperator(
         task_id='end',
-        trigger_rule=TriggerRule.ALL_DONE,
-        doc='Pipeline end marker'
+        trigger_rule=TriggerRule.ALL_SUCCESS,
+        doc='Pipeline end marker; fails the run if validation or analytics failed'
     )
     
     # -------------------------------------------------------------------------
@@ -706,13 +1075,21 @@ with DAG(
     # This defines the order in which tasks run.
     # The >> operator means "runs before"
     
-    # Linear pipeline flow:
-    # start → download → validate_source → fifo_matching → 
-    # validate_results → build_analytics → send_alerts → end
-    
-    start >> download_data_task >> validate_source_task >> fifo_matching_task
-    fifo_matching_task >> validate_results_task >> build_analytics_task
-    build_analytics_task >> send_alerts_task >> end
+    # Pipeline flow:
+    # start → download → stage_source → validate_source → fifo_matching
+    # fifo_matching → [validate_results, build_analytics]
+    # [validate_source, validate_results, build_analytics] → alerts → end
+    # [validate_source, validate_results, build_analytics] → end (run state)
+    #
+    # validate_source stays upstream of every task that writes output, so
+    # nothing is matched or published from a source that failed its checks.
+    
+    start >> download_data_task >> stage_source_task >> validate_source_task
+    validate_source_task >> fifo_matching_task
+    fifo_matching_task >> [validate_results_task, build_analytics_task]
+    [validate_source_task, validate_results_task, build_analytics_task] >> alerts_group
+    alerts_group >> end
+    [validate_source_task, validate_results_task, build_analytics_task] >> end
 
 
 # =============================================================================
@@ -734,11 +1111,12 @@ to link spent/expired transactions to earned transactions.
 
 ## Tasks
 1. **download_data**: Fetch transaction data from source
-2. **validate_source**: Check data quality before processing
-3. **perform_fifo_matching**: Execute FIFO matching algorithm
-4. **validate_results**: Verify matching correctness
-5. **build_analytics**: Create reporting tables
-6. **send_alerts**: Notify team of completion
+2. **stage_source**: Parse the workbook once into parquet
+3. **validate_source**: Check data quality before processing
+4. **perform_fifo_matching**: Execute FIFO matching algorithm
+5. **validate_results**: Verify matching correctness
+6. **build_analytics**: Create reporting tables
+7. **alerts**: Notify team of completion (Slack, email and dashboard in parallel)
 
 ## Contacts
 - Owner: Data Applications Team
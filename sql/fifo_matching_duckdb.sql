@@ -0,0 +1,120 @@
+-- =============================================================================
+-- FIFO MATCHING - DUCKDB REFERENCE QUERY
+-- =============================================================================
+--
+-- PURPOSE:
+--     The FIFO matching rules of src/fifo_matching.py written as a single
+--     query, for ad-hoc checks in DuckDB. It is NOT used by the pipeline:
+--     perform_fifo_matching() is the production matcher and is far faster.
+--     tests/test_fifo_matching.py runs this query against it for parity.
+--
+-- TABLES USED:
+--     - tc_data: Raw Thrive Cash transactions. Must be a real table, not a
+--       view: its rowid (load order) breaks ties between rows with the same
+--       CREATEDAT, the way row order does in the pandas version.
+--
+-- OUTPUT:
+--     Every column of tc_data plus REDEEMID, in the table's row order.
+--
+-- DIFFERENCES FROM perform_fifo_matching():
+--     - Amounts are compared in exact cents (DECIMAL). The pandas version
+--       subtracts floats, so when earned amounts add up to a redemption
+--       exactly it can be left with a tiny residue and consume one more
+--       earned row.
+--     - Expects data that passed validate_source_data(): rows with a
+--       missing CREATEDAT or AMOUNT are not handled the same way.
+--
+-- HOW IT WORKS:
+--     Earned rows are consumed whole, so matching can't be done by lining up
+--     running totals of earned against running totals of redeemed: any
+--     overshoot of the last earned row is lost, not carried to the next
+--     redemption. Instead each customer's redemptions are walked in order by
+--     a recursive CTE that carries the cursor (how many earned rows are used
+--     so far). Each step is one lookup on the earned running total, and every
+--     customer advances in the same iteration, so the number of iterations is
+--     the largest number of redemptions any one customer has.
+--
+-- AUTHOR: Data Applications Team
+-- DATE: 2024
+-- =============================================================================
+
+WITH RECURSIVE
+source AS (
+    SELECT rowid AS row_pos, * FROM tc_data
+),
+earned AS (
+    SELECT
+        CUSTOMERID,
+        row_pos,
+        CREATEDAT,
+        ROW_NUMBER() OVER fifo AS earned_rank,
+        SUM(CAST(AMOUNT AS DECIMAL(18, 2))) OVER (
+            fifo ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+        ) AS cum_earned
+    FROM source
+    WHERE TCTYPE = 'earned' AND CUSTOMERID IS NOT NULL
+    WINDOW fifo AS (PARTITION BY CUSTOMERID ORDER BY CREATEDAT, row_pos)
+),
+redemptions AS (
+    SELECT
+        r.CUSTOMERID,
+        r.TRANS_ID,
+        ROW_NUMBER() OVER (
+            PARTITION BY r.CUSTOMERID ORDER BY r.CREATEDAT, r.row_pos
+        ) AS redemption_rank,
+        ABS(CAST(r.AMOUNT AS DECIMAL(18, 2))) AS amount,
+        -- Earned rows dated on or before the redemption (a prefix of the FIFO order)
+        (SELECT COUNT(*) FROM earned e
+         WHERE e.CUSTOMERID = r.CUSTOMERID AND e.CREATEDAT <= r.CREATEDAT) AS eligible
+    FROM source r
+    WHERE r.TCTYPE IN ('spent', 'expired') AND r.CUSTOMERID IS NOT NULL
+),
+steps AS (
+    -- Step 0 per customer: nothing consumed yet
+    SELECT DISTINCT
+        CUSTOMERID,
+        0::BIGINT AS redemption_rank,
+        NULL::BIGINT AS TRANS_ID,
+        0::BIGINT AS consumed_before,
+        0::BIGINT AS consumed_after,
+        0::DECIMAL(18, 2) AS cum_after
+    FROM redemptions
+    UNION ALL
+    -- Step k: the next redemption takes earned rows until it is covered
+    -- or it runs out of eligible ones
+    SELECT
+        r.CUSTOMERID,
+        r.redemption_rank,
+        r.TRANS_ID,
+        s.consumed_after,
+        n.consumed_after,
+        COALESCE(e.cum_earned, 0)
+    FROM steps s
+    JOIN redemptions r
+      ON r.CUSTOMERID = s.CUSTOMERID AND r.redemption_rank = s.redemption_rank + 1
+    CROSS JOIN LATERAL (
+        SELECT CASE
+            WHEN r.amount <= 0 OR s.consumed_after >= r.eligible THEN s.consumed_after
+            ELSE LEAST(r.eligible, COALESCE((
+                SELECT MIN(c.earned_rank) FROM earned c
+                WHERE c.CUSTOMERID = r.CUSTOMERID
+                  AND c.earned_rank > s.consumed_after
+                  AND c.cum_earned >= s.cum_after + r.amount
+            ), r.eligible))
+        END AS consumed_after
+    ) n
+    LEFT JOIN earned e
+      ON e.CUSTOMERID = r.CUSTOMERID AND e.earned_rank = n.consumed_after
+),
+matches AS (
+    SELECT e.row_pos, s.TRANS_ID AS REDEEMID
+    FROM earned e
+    JOIN steps s
+      ON s.CUSTOMERID = e.CUSTOMERID
+     AND e.earned_rank > s.consumed_before
+     AND e.earned_rank <= s.consumed_after
+)
+SELECT source.* EXCLUDE (row_pos), matches.REDEEMID
+FROM source
+LEFT JOIN matches USING (row_pos)
+ORDER BY source.row_pos;
@@ -6,5 +6,6 @@
 #
 # - fifo_matching.py: FIFO matching algorithm for transactions
 # - data_quality.py: Data validation and quality checks
+# - jit.py: Optional Numba compilation for array kernels
 #
 # =============================================================================
@@ -32,11 +32,18 @@ DATE: 2024
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from typing import Callable, Dict, List, TextIO, Tuple, Optional
+from dataclasses import dataclass, field
 from datetime import datetime
+import io
 import logging
 
+# Works both as part of the src package and with src/ on sys.path
+try:
+    from .fifo_matching import EARNED, EXPIRED, SPENT, transaction_type_codes
+except ImportError:
+    from fifo_matching import EARNED, EXPIRED, SPENT, transaction_type_codes
+
 # -----------------------------------------------------------------------------
 # LOGGING CONFIGURATION
 # -----------------------------------------------------------------------------
@@ -46,14 +53,49 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# The only transaction types our business logic knows about
+TRANSACTION_TYPES = ['earned', 'spent', 'expired']
+
+# Columns every transaction needs for FIFO matching to work correctly
+REQUIRED_FIELDS = ['TRANS_ID', 'TCTYPE', 'CREATEDAT', 'CUSTOMERID', 'AMOUNT']
+
+
+def _nullable_int_ids(df: pd.DataFrame, columns: List[str]) -> Dict[str, pd.Series]:
+    """
+    Return the given ID columns cast to nullable Int64.
+    
+    FIFO matching already produces REDEEMID as Int64, but read back from
+    CSV it is float (NaN for "unmatched") and other sources may hand it
+    over as object; Int64 stores either as a contiguous int64 buffer plus
+    a null mask. Columns that already are Int64, or hold values that
+    aren't whole numbers, are left out.
+    """
+    converted = {}
+    for col in columns:
+        if isinstance(df[col].dtype, pd.Int64Dtype):
+            continue
+        try:
+            converted[col] = df[col].astype('Int64')
+        except (TypeError, ValueError):
+            pass
+    return converted
+
+
+def _type_masks(tctype: pd.Series) -> Dict[str, np.ndarray]:
+    """Build one boolean mask per transaction type from a single recode."""
+    codes = transaction_type_codes(tctype)
+    return {'earned': codes == EARNED, 'spent': codes == SPENT, 'expired': codes == EXPIRED}
+
 
 # =============================================================================
 # DATA CLASSES FOR VALIDATION RESULTS
 # =============================================================================
 # Using dataclasses to structure validation results makes them easy to
-# understand and work with programmatically.
+# understand and work with programmatically. Both are slotted (no per-
+# instance __dict__) and frozen: a result or report never changes once
+# it has been built.
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ValidationResult:
     """
     Represents the result of a single validation check.
@@ -81,7 +123,7 @@ class ValidationResult:
     details: Optional[Dict] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ValidationReport:
     """
     Aggregated report of all validation checks.
@@ -89,53 +131,351 @@ class ValidationReport:
     ATTRIBUTES:
         timestamp: When the validation was run
         stage: Which pipeline stage ('source', 'post_fifo', 'output')
-        results: List of individual ValidationResult objects
+        results: Individual ValidationResult objects (any sequence may be
+                 passed in; it is stored as a tuple)
         passed: True if ALL error-level checks passed
         
     METHODS:
         summary(): Returns a human-readable summary string
+        write_summary(fp): Streams the same summary to a file
         to_dict(): Converts to dictionary for JSON serialization
     """
     timestamp: datetime
     stage: str
-    results: List[ValidationResult]
+    results: Tuple[ValidationResult, ...]
+    
+    # Failure counts, tallied once in __post_init__ (results never change)
+    _error_count: int = field(init=False, repr=False, compare=False)
+    _warning_count: int = field(init=False, repr=False, compare=False)
+    
+    # summary() text, built on first use - nothing it reads can change
+    _summary: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Frozen dataclass: bypass __setattr__ to normalise the sequence
+        # and store the counts
+        results = tuple(self.results)
+        object.__setattr__(self, 'results', results)
+        
+        # One pass over the results for both counts
+        error_count = warning_count = 0
+        for r in results:
+            if not r.passed:
+                if r.severity == 'ERROR':
+                    error_count += 1
+                elif r.severity == 'WARNING':
+                    warning_count += 1
+        object.__setattr__(self, '_error_count', error_count)
+        object.__setattr__(self, '_warning_count', warning_count)
     
     @property
     def passed(self) -> bool:
         """Check if all ERROR-level validations passed."""
-        return all(r.passed for r in self.results if r.severity == 'ERROR')
+        return self._error_count == 0
     
     @property
     def error_count(self) -> int:
         """Count of failed ERROR-level checks."""
-        return sum(1 for r in self.results if not r.passed and r.severity == 'ERROR')
+        return self._error_count
     
     @property
     def warning_count(self) -> int:
         """Count of failed WARNING-level checks."""
-        return sum(1 for r in self.results if not r.passed and r.severity == 'WARNING')
+        return self._warning_count
     
     def summary(self) -> str:
         """Generate a human-readable summary of validation results."""
-        lines = [
-            "=" * 60,
-            f"VALIDATION REPORT: {self.stage.upper()}",
-            f"Timestamp: {self.timestamp}",
-            "=" * 60,
-            f"Overall Status: {'PASSED ✓' if self.passed else 'FAILED ✗'}",
-            f"Errors: {self.error_count} | Warnings: {self.warning_count}",
-            "-" * 60,
-        ]
+        # Built once and reused: reports are often logged more than once
+        if self._summary is None:
+            object.__setattr__(self, '_summary', self._render_summary())
+        return self._summary
+    
+    def _render_summary(self) -> str:
+        buffer = io.StringIO()
+        self.write_summary(buffer)
+        return buffer.getvalue()[:-1]  # drop the final newline
+    
+    def write_summary(self, fp: TextIO) -> None:
+        """
+        Write the summary to an open text stream, one line at a time.
+        
+        Nothing larger than a line is held in memory, which matters for
+        reports with thousands of failure details. The text is the same
+        as summary() plus a final newline.
+        """
+        rule = "=" * 60
+        fp.write(f"{rule}\n")
+        fp.write(f"VALIDATION REPORT: {self.stage.upper()}\n")
+        fp.write(f"Timestamp: {self.timestamp}\n")
+        fp.write(f"{rule}\n")
+        fp.write(f"Overall Status: {'PASSED ✓' if self.passed else 'FAILED ✗'}\n")
+        fp.write(f"Errors: {self.error_count} | Warnings: {self.warning_count}\n")
+        fp.write(f"{'-' * 60}\n")
         
         for result in self.results:
             status = "✓" if result.passed else "✗"
-            lines.append(f"[{result.severity}] {status} {result.check_name}")
-            lines.append(f"    {result.message}")
+            fp.write(f"[{result.severity}] {status} {result.check_name}\n")
+            fp.write(f"    {result.message}\n")
             if result.details and not result.passed:
-                lines.append(f"    Details: {result.details}")
+                fp.write(f"    Details: {result.details}\n")
+        
+        fp.write(f"{rule}\n")
+
+
+def _short_circuit(
+    df: pd.DataFrame,
+    required_columns: List[str],
+    stage: str,
+    results: List[ValidationResult]
+) -> Optional[ValidationReport]:
+    """
+    Finish a report early when the data can't be meaningfully checked.
+    
+    WHAT THIS DOES:
+        If required columns are missing, appends one ERROR listing them;
+        if there are no rows, appends one WARNING. Either way the report
+        is returned straight away, so the checks after this point never
+        have to guard against missing columns or empty frames. Returns
+        None when the data is fit for the full set of checks.
+    """
+    return (
+        _missing_columns_report(df.columns, required_columns, stage, results)
+        or (_empty_report(stage, results) if df.empty else None)
+    )
+
+
+def _missing_columns_report(
+    columns,
+    required_columns: List[str],
+    stage: str,
+    results: List[ValidationResult]
+) -> Optional[ValidationReport]:
+    """Return a finished ERROR report if any required column is missing."""
+    missing_columns = [col for col in required_columns if col not in columns]
+    if not missing_columns:
+        return None
+    
+    results.append(ValidationResult(
+        check_name="Required Columns Present",
+        passed=False,
+        message=f"Missing required columns: {missing_columns}",
+        severity='ERROR',
+        details={'missing_columns': missing_columns}
+    ))
+    return ValidationReport(timestamp=datetime.now(), stage=stage, results=results)
+
+
+def _empty_report(stage: str, results: List[ValidationResult]) -> ValidationReport:
+    """Return a finished report with a WARNING that there were no rows."""
+    results.append(ValidationResult(
+        check_name="Data Present",
+        passed=False,
+        message="No transactions to validate",
+        severity='WARNING'
+    ))
+    return ValidationReport(timestamp=datetime.now(), stage=stage, results=results)
+
+
+# =============================================================================
+# SOURCE CHECK RESULTS
+# =============================================================================
+# Each source check is computed by whichever engine runs it (pandas below,
+# or polars in validate_source_data_lazy) and turned into a ValidationResult
+# by one of these builders, so both engines report identically.
+
+def _null_value_results(null_counts: Dict[str, int], row_count: int) -> List[ValidationResult]:
+    """CHECK 1: one result per required field."""
+    results = []
+    for field_name in REQUIRED_FIELDS:
+        null_count = null_counts[field_name]
+        passed = null_count == 0
+        
+        results.append(ValidationResult(
+            check_name=f"No Null Values: {field_name}",
+            passed=passed,
+            message=f"Found {null_count} null values in {field_name}" if not passed 
+                    else f"All {row_count} records have valid {field_name}",
+            severity='ERROR',
+            details={'null_count': int(null_count)} if not passed else None
+        ))
+    return results
+
+
+def _transaction_type_result(actual_types: set) -> ValidationResult:
+    """CHECK 2: only earned/spent/expired may appear."""
+    invalid_types = actual_types - set(TRANSACTION_TYPES)
+    
+    return ValidationResult(
+        check_name="Valid Transaction Types",
+        passed=len(invalid_types) == 0,
+        message=f"Invalid types found: {invalid_types}" if invalid_types 
+                else f"All transactions have valid types: {actual_types}",
+        severity='ERROR',
+        details={'invalid_types': list(invalid_types)} if invalid_types else None
+    )
+
+
+def _amount_sign_result(
+    earned_positive: bool,
+    spent_negative: bool,
+    expired_negative: bool
+) -> ValidationResult:
+    """CHECK 3: earned > 0, spent/expired < 0."""
+    sign_check_passed = earned_positive and spent_negative and expired_negative
+    
+    return ValidationResult(
+        check_name="Amount Sign Consistency",
+        passed=sign_check_passed,
+        message="All amounts have correct signs (earned>0, spent/expired<0)" if sign_check_passed
+                else "Some amounts have incorrect signs",
+        severity='ERROR',
+        details={
+            'earned_all_positive': bool(earned_positive),
+            'spent_all_negative': bool(spent_negative),
+            'expired_all_negative': bool(expired_negative)
+        } if not sign_check_passed else None
+    )
+
+
+def _duplicate_id_result(duplicate_ids: list) -> ValidationResult:
+    """CHECK 4: every TRANS_ID is unique."""
+    return ValidationResult(
+        check_name="No Duplicate Transaction IDs",
+        passed=len(duplicate_ids) == 0,
+        message=f"Found {len(duplicate_ids)} duplicate TRANS_IDs" if duplicate_ids
+                else "All transaction IDs are unique",
+        severity='ERROR',
+        details={'duplicate_ids': duplicate_ids} if duplicate_ids else None
+    )
+
+
+def _future_date_result(future_count: int) -> ValidationResult:
+    """CHECK 5: no transactions dated in the future."""
+    return ValidationResult(
+        check_name="No Future Dates",
+        passed=future_count == 0,
+        message=f"Found {future_count} transactions with future dates" if future_count > 0
+                else "All transaction dates are in the past",
+        severity='WARNING',  # Warning because clock skew could cause this
+        details={'future_count': future_count} if future_count > 0 else None
+    )
+
+
+def _customer_id_result(invalid_customer_count: int) -> ValidationResult:
+    """CHECK 6: customer IDs are positive."""
+    return ValidationResult(
+        check_name="Valid Customer IDs",
+        passed=invalid_customer_count == 0,
+        message=f"Found {invalid_customer_count} invalid customer IDs" if invalid_customer_count > 0
+                else "All customer IDs are valid positive numbers",
+        severity='ERROR',
+        details=None
+    )
+
+
+def _completeness_result(
+    row_count: int,
+    unique_customers: int,
+    type_counts: Dict[str, int],
+    date_min,
+    date_max
+) -> ValidationResult:
+    """CHECK 7: informational summary of what was loaded."""
+    return ValidationResult(
+        check_name="Data Completeness Summary",
+        passed=True,
+        message=f"Loaded {row_count} transactions for {unique_customers} customers",
+        severity='INFO',
+        details={
+            'total_transactions': row_count,
+            'unique_customers': unique_customers,
+            'transaction_types': type_counts,
+            'date_range': f"{date_min} to {date_max}"
+        }
+    )
+
+
+# =============================================================================
+# CHECK DEPENDENCY GRAPH
+# =============================================================================
+# Some checks are only meaningful if another one passed - there is no
+# point judging amount signs per type when the types themselves are bad.
+# Checks declare those dependencies and CheckRunner walks the graph once,
+# skipping every check downstream of a failure.
+
+@dataclass(frozen=True)
+class Check:
+    """
+    One node in a validation dependency graph.
+    
+    ATTRIBUTES:
+        name: Check name, used in reports and in other checks' deps
+        fn: Takes the shared context dict and returns this check's results.
+            It may also leave intermediate values (type codes, masks) in
+            the context for the checks that depend on it.
+        deps: Names of checks that must pass before this one runs
+    """
+    name: str
+    fn: Callable[[Dict], List[ValidationResult]]
+    deps: Tuple[str, ...] = ()
+
+
+class CheckRunner:
+    """
+    Runs a set of Checks in dependency order.
+    
+    The order is worked out once, when the runner is built: a check comes
+    after all of its deps, and otherwise checks keep the order they were
+    given in (so reports read the same every time). A check whose dep
+    failed - any ERROR result not passed - or was itself skipped is not
+    run; an INFO result records that it was skipped and why.
+    """
+    
+    def __init__(self, checks: List[Check]):
+        self.checks = self._dependency_order(checks)
+    
+    @staticmethod
+    def _dependency_order(checks: List[Check]) -> List[Check]:
+        known = {check.name for check in checks}
+        for check in checks:
+            unknown = set(check.deps) - known
+            if unknown:
+                raise ValueError(f"Check '{check.name}' depends on unknown checks: {unknown}")
+        
+        # Repeatedly take the earliest check whose deps are all placed
+        ordered, placed = [], set()
+        pending = list(checks)
+        while pending:
+            ready = next((c for c in pending if placed.issuperset(c.deps)), None)
+            if ready is None:
+                raise ValueError(f"Check dependencies form a cycle: {[c.name for c in pending]}")
+            ordered.append(ready)
+            placed.add(ready.name)
+            pending.remove(ready)
+        return ordered
+    
+    def run(self, ctx: Dict) -> List[ValidationResult]:
+        results = []
+        failed = set()
         
-        lines.append("=" * 60)
-        return "\n".join(lines)
+        for check in self.checks:
+            failed_deps = [dep for dep in check.deps if dep in failed]
+            if failed_deps:
+                failed.add(check.name)
+                results.append(ValidationResult(
+                    check_name=check.name,
+                    passed=False,
+                    message=f"Skipped because {', '.join(failed_deps)} failed",
+                    severity='INFO'
+                ))
+                continue
+            
+            check_results = check.fn(ctx)
+            if any(not r.passed and r.severity == 'ERROR' for r in check_results):
+                failed.add(check.name)
+            results.extend(check_results)
+        
+        return results
 
 
 # =============================================================================
@@ -183,133 +523,275 @@ def validate_source_data(df: pd.DataFrame) -> ValidationReport:
     logger.info("Running source data validation...")
     results = []
     
-    # -------------------------------------------------------------------------
-    # CHECK 1: Required Fields Not Null
-    # -------------------------------------------------------------------------
-    # These fields are essential for FIFO matching to work correctly.
-    
-    required_fields = ['TRANS_ID', 'TCTYPE', 'CREATEDAT', 'CUSTOMERID', 'AMOUNT']
-    
-    for field in required_fields:
-        null_count = df[field].isna().sum()
-        passed = null_count == 0
-        
-        results.append(ValidationResult(
-            check_name=f"No Null Values: {field}",
-            passed=passed,
-            message=f"Found {null_count} null values in {field}" if not passed 
-                    else f"All {len(df)} records have valid {field}",
-            severity='ERROR',
-            details={'null_count': int(null_count)} if not passed else None
-        ))
-    
-    # -------------------------------------------------------------------------
-    # CHECK 2: Valid Transaction Types
-    # -------------------------------------------------------------------------
-    # Only these three types are valid in our business logic.
-    
-    valid_types = {'earned', 'spent', 'expired'}
-    actual_types = set(df['TCTYPE'].dropna().unique())
-    invalid_types = actual_types - valid_types
+    # Missing columns or no rows: report that alone and stop
+    early_report = _short_circuit(df, REQUIRED_FIELDS, 'source', results)
+    if early_report is not None:
+        return early_report
     
-    results.append(ValidationResult(
-        check_name="Valid Transaction Types",
-        passed=len(invalid_types) == 0,
-        message=f"Invalid types found: {invalid_types}" if invalid_types 
-                else f"All transactions have valid types: {actual_types}",
-        severity='ERROR',
-        details={'invalid_types': list(invalid_types)} if invalid_types else None
-    ))
+    results.extend(_SOURCE_CHECKS.run({'df': df}))
     
-    # -------------------------------------------------------------------------
-    # CHECK 3: Amount Sign Consistency
-    # -------------------------------------------------------------------------
-    # Business rule: earned = positive, spent/expired = negative
+    return ValidationReport(
+        timestamp=datetime.now(),
+        stage='source',
+        results=results
+    )
+
+
+# -----------------------------------------------------------------------------
+# CHECK 1: Required Fields Not Null
+# -----------------------------------------------------------------------------
+# These fields are essential for FIFO matching to work correctly.
+
+def _check_required_not_null(ctx: Dict) -> List[ValidationResult]:
+    df = ctx['df']
+    # All null counts in one pass over the required columns
+    null_counts = df[REQUIRED_FIELDS].isna().sum()
+    return _null_value_results(null_counts.to_dict(), len(df))
+
+
+# -----------------------------------------------------------------------------
+# CHECK 2: Valid Transaction Types
+# -----------------------------------------------------------------------------
+# Only these three types are valid in our business logic.
+
+def _context_type_codes(ctx: Dict) -> np.ndarray:
+    """TCTYPE codes, recoded once per run and shared through the context."""
+    if 'type_codes' not in ctx:
+        ctx['type_codes'] = transaction_type_codes(ctx['df']['TCTYPE'])
+    return ctx['type_codes']
+
+
+def _check_transaction_types(ctx: Dict) -> List[ValidationResult]:
+    df = ctx['df']
+    _context_type_codes(ctx)  # recoded here once; later checks reuse the codes
+    return [_transaction_type_result(set(df['TCTYPE'].dropna().unique()))]
+
+
+# -----------------------------------------------------------------------------
+# CHECK 3: Amount Sign Consistency (only if CHECK 2 passed)
+# -----------------------------------------------------------------------------
+# Business rule: earned = positive, spent/expired = negative
+
+def _check_amount_signs(ctx: Dict) -> List[ValidationResult]:
+    # One pass: multiply each amount by the sign its type should have, so
+    # every correct row is > 0. NaN amounts fail, like the plain
+    # comparisons would. Rows with a null type (code -1) pick up the
+    # trailing 0 and are ignored below - CHECK 1 reports those.
+    codes = _context_type_codes(ctx)
+    expected_sign = np.array([1.0, -1.0, -1.0, 0.0])[codes]
+    amount = ctx['df']['AMOUNT'].to_numpy(dtype=float, na_value=np.nan)
+    wrong_sign_codes = codes[~(amount * expected_sign > 0)]
+    
+    return [_amount_sign_result(
+        earned_positive=not (wrong_sign_codes == EARNED).any(),
+        spent_negative=not (wrong_sign_codes == SPENT).any(),
+        expired_negative=not (wrong_sign_codes == EXPIRED).any(),
+    )]
+
+
+# -----------------------------------------------------------------------------
+# CHECK 4: No Duplicate Transaction IDs
+# -----------------------------------------------------------------------------
+# Each transaction should have a unique identifier.
+
+def _check_unique_trans_ids(ctx: Dict) -> List[ValidationResult]:
+    df = ctx['df']
+    # Count from the mask; only slice out the offending IDs when there are any
+    duplicate_mask = df['TRANS_ID'].duplicated()
+    duplicate_ids = []
+    if duplicate_mask.any():
+        duplicate_ids = df.loc[duplicate_mask, 'TRANS_ID'].tolist()
+    return [_duplicate_id_result(duplicate_ids)]
+
+
+# -----------------------------------------------------------------------------
+# CHECK 5: Dates Are Reasonable
+# -----------------------------------------------------------------------------
+# Transactions shouldn't be in the future (data quality issue).
+
+def _check_future_dates(ctx: Dict) -> List[ValidationResult]:
+    # A datetime64 column is compared as raw int64 against a datetime64
+    # scalar (NaT compares False) and the mask is summed without pulling
+    # out the rows. Anything else keeps the elementwise comparison.
+    created_at = ctx['df']['CREATEDAT']
+    if pd.api.types.is_datetime64_dtype(created_at):
+        future_mask = created_at.to_numpy() > np.datetime64(datetime.now())
+    else:
+        future_mask = created_at > datetime.now()
+    return [_future_date_result(int(future_mask.sum()))]
+
+
+# -----------------------------------------------------------------------------
+# CHECK 6: Customer IDs Are Valid
+# -----------------------------------------------------------------------------
+# Customer IDs should be positive integers.
+
+def _check_customer_ids(ctx: Dict) -> List[ValidationResult]:
+    # Only a count is needed, so sum the mask rather than materialising
+    # the failing rows. Nulls compare False and are left to CHECK 1.
+    customer_ids = ctx['df']['CUSTOMERID']
+    if (pd.api.types.is_numeric_dtype(customer_ids)
+            and not pd.api.types.is_bool_dtype(customer_ids)):
+        invalid_customer_count = int((customer_ids <= 0).sum())
+    else:
+        invalid_customer_count = 0
+    
+    return [_customer_id_result(invalid_customer_count)]
+
+
+# -----------------------------------------------------------------------------
+# CHECK 7: Data Completeness Summary
+# -----------------------------------------------------------------------------
+# Informational check about the data we received.
+
+def _check_completeness(ctx: Dict) -> List[ValidationResult]:
+    df = ctx['df']
+    codes = _context_type_codes(ctx)
+    
+    if (codes >= 0).sum() == df['TCTYPE'].count():
+        # Every non-null type is known: count the shared codes instead of
+        # hashing the column again (most common first, like value_counts)
+        counts = np.bincount(codes[codes >= 0], minlength=len(TRANSACTION_TYPES))
+        type_counts = {
+            TRANSACTION_TYPES[code]: int(counts[code])
+            for code in np.argsort(-counts, kind='stable') if counts[code] > 0
+        }
+    else:
+        # Unknown types need their own keys (CHECK 2 has flagged them)
+        type_counts = df['TCTYPE'].value_counts().to_dict()
+    
+    return [_completeness_result(
+        row_count=len(df),
+        unique_customers=int(df['CUSTOMERID'].nunique()),
+        type_counts=type_counts,
+        date_min=df['CREATEDAT'].min(),
+        date_max=df['CREATEDAT'].max(),
+    )]
+
+
+_SOURCE_CHECKS = CheckRunner([
+    Check("No Null Values", _check_required_not_null),
+    Check("Valid Transaction Types", _check_transaction_types),
+    Check("Amount Sign Consistency", _check_amount_signs, deps=("Valid Transaction Types",)),
+    Check("No Duplicate Transaction IDs", _check_unique_trans_ids),
+    Check("No Future Dates", _check_future_dates),
+    Check("Valid Customer IDs", _check_customer_ids),
+    Check("Data Completeness Summary", _check_completeness),
+])
+
+
+def validate_source_data_lazy(lf) -> ValidationReport:
+    """
+    Validate source data held in a polars LazyFrame, in one scan.
     
-    earned_positive = df[df['TCTYPE'] == 'earned']['AMOUNT'].gt(0).all()
-    spent_negative = df[df['TCTYPE'] == 'spent']['AMOUNT'].lt(0).all()
-    expired_negative = df[df['TCTYPE'] == 'expired']['AMOUNT'].lt(0).all()
+    ==========================================================================
+    WHAT THIS DOES:
+    ==========================================================================
     
-    sign_check_passed = earned_positive and spent_negative and expired_negative
+    Runs the same checks as validate_source_data() and produces an
+    identical report, but every check is written as a polars aggregate
+    expression and all of them are collected together. Polars fuses them
+    into a single streamed pass, so a large parquet file is never loaded
+    into memory as a whole - only the one-row result is.
     
-    results.append(ValidationResult(
-        check_name="Amount Sign Consistency",
-        passed=sign_check_passed,
-        message="All amounts have correct signs (earned>0, spent/expired<0)" if sign_check_passed
-                else "Some amounts have incorrect signs",
-        severity='ERROR',
-        details={
-            'earned_all_positive': bool(earned_positive),
-            'spent_all_negative': bool(spent_negative),
-            'expired_all_negative': bool(expired_negative)
-        } if not sign_check_passed else None
-    ))
+    The list of duplicate IDs is fetched with a second, filtered query
+    only when duplicates exist.
     
-    # -------------------------------------------------------------------------
-    # CHECK 4: No Duplicate Transaction IDs
-    # -------------------------------------------------------------------------
-    # Each transaction should have a unique identifier.
+    PARAMETERS:
+        lf: polars LazyFrame with the TC_Data columns, e.g.
+            pl.scan_parquet('data/.cache/<sha>/TC_Data.parquet')
     
-    duplicate_ids = df[df['TRANS_ID'].duplicated()]['TRANS_ID'].tolist()
+    RETURNS:
+        ValidationReport with all check results
     
-    results.append(ValidationResult(
-        check_name="No Duplicate Transaction IDs",
-        passed=len(duplicate_ids) == 0,
-        message=f"Found {len(duplicate_ids)} duplicate TRANS_IDs" if duplicate_ids
-                else "All transaction IDs are unique",
-        severity='ERROR',
-        details={'duplicate_ids': duplicate_ids} if duplicate_ids else None
-    ))
+    EXAMPLE:
+        >>> import polars as pl
+        >>> report = validate_source_data_lazy(pl.scan_parquet(path))
+        >>> print(report.summary())
+    """
+    import polars as pl
     
-    # -------------------------------------------------------------------------
-    # CHECK 5: Dates Are Reasonable
-    # -------------------------------------------------------------------------
-    # Transactions shouldn't be in the future (data quality issue).
+    logger.info("Running source data validation (lazy)...")
+    results = []
+    schema = lf.collect_schema()
     
-    future_dates = df[df['CREATEDAT'] > datetime.now()]
+    # Missing columns: report that alone and stop
+    early_report = _missing_columns_report(schema.names(), REQUIRED_FIELDS, 'source', results)
+    if early_report is not None:
+        return early_report
     
-    results.append(ValidationResult(
-        check_name="No Future Dates",
-        passed=len(future_dates) == 0,
-        message=f"Found {len(future_dates)} transactions with future dates" if len(future_dates) > 0
-                else "All transaction dates are in the past",
-        severity='WARNING',  # Warning because clock skew could cause this
-        details={'future_count': len(future_dates)} if len(future_dates) > 0 else None
-    ))
+    def without_nan(name):
+        # pandas treats NaN as missing; polars keeps NaN distinct from null
+        col = pl.col(name)
+        return col.fill_nan(None) if schema[name].is_float() else col
     
-    # -------------------------------------------------------------------------
-    # CHECK 6: Customer IDs Are Valid
-    # -------------------------------------------------------------------------
-    # Customer IDs should be positive integers.
+    tctype = pl.col('TCTYPE').cast(pl.String)
+    amount = without_nan('AMOUNT')
+    customer_ids = without_nan('CUSTOMERID')
     
-    invalid_customers = df[df['CUSTOMERID'] <= 0] if df['CUSTOMERID'].dtype in ['int64', 'float64'] else pd.DataFrame()
+    def all_true(condition):
+        # Missing values fail a condition, like pandas' comparison semantics
+        return condition.fill_null(False).all()
     
-    results.append(ValidationResult(
-        check_name="Valid Customer IDs",
-        passed=len(invalid_customers) == 0,
-        message=f"Found {len(invalid_customers)} invalid customer IDs" if len(invalid_customers) > 0
-                else "All customer IDs are valid positive numbers",
-        severity='ERROR',
-        details=None
-    ))
+    customer_check = (
+        (customer_ids <= 0).sum()
+        if schema['CUSTOMERID'].is_numeric() else pl.lit(0)
+    )
     
-    # -------------------------------------------------------------------------
-    # CHECK 7: Data Completeness Summary
-    # -------------------------------------------------------------------------
-    # Informational check about the data we received.
+    stats = lf.select(
+        pl.len().alias('row_count'),
+        *[without_nan(name).null_count().alias(f'nulls_{name}') for name in REQUIRED_FIELDS],
+        tctype.drop_nulls().unique(maintain_order=True).implode().alias('types'),
+        all_true(amount.filter(tctype == 'earned') > 0).alias('earned_positive'),
+        all_true(amount.filter(tctype == 'spent') < 0).alias('spent_negative'),
+        all_true(amount.filter(tctype == 'expired') < 0).alias('expired_negative'),
+        (pl.len() - pl.col('TRANS_ID').n_unique()).alias('duplicate_count'),
+        (pl.col('CREATEDAT') > datetime.now()).sum().alias('future_count'),
+        customer_check.alias('invalid_customer_count'),
+        customer_ids.drop_nulls().n_unique().alias('unique_customers'),
+        tctype.drop_nulls().value_counts(sort=True, name='count').implode().alias('type_counts'),
+        pl.col('CREATEDAT').min().alias('date_min'),
+        pl.col('CREATEDAT').max().alias('date_max'),
+    ).collect(engine='streaming').row(0, named=True)
+    
+    row_count = stats['row_count']
+    if row_count == 0:
+        return _empty_report('source', results)
+    
+    def duplicate_ids():
+        # Second query, only run when there is something to list
+        if stats['duplicate_count'] == 0:
+            return []
+        return (
+            lf.filter(~pl.col('TRANS_ID').is_first_distinct())
+            .select('TRANS_ID').collect()['TRANS_ID'].to_list()
+        )
     
-    results.append(ValidationResult(
-        check_name="Data Completeness Summary",
-        passed=True,
-        message=f"Loaded {len(df)} transactions for {df['CUSTOMERID'].nunique()} customers",
-        severity='INFO',
-        details={
-            'total_transactions': len(df),
-            'unique_customers': int(df['CUSTOMERID'].nunique()),
-            'transaction_types': df['TCTYPE'].value_counts().to_dict(),
-            'date_range': f"{df['CREATEDAT'].min()} to {df['CREATEDAT'].max()}"
-        }
-    ))
+    # Same names and dependencies as _SOURCE_CHECKS, reading the stats
+    # collected above instead of scanning a DataFrame
+    runner = CheckRunner([
+        Check("No Null Values", lambda ctx: _null_value_results(
+            {name: stats[f'nulls_{name}'] for name in REQUIRED_FIELDS}, row_count)),
+        Check("Valid Transaction Types", lambda ctx: [
+            _transaction_type_result(set(stats['types']))]),
+        Check("Amount Sign Consistency", lambda ctx: [_amount_sign_result(
+            stats['earned_positive'], stats['spent_negative'], stats['expired_negative'])],
+            deps=("Valid Transaction Types",)),
+        Check("No Duplicate Transaction IDs", lambda ctx: [
+            _duplicate_id_result(duplicate_ids())]),
+        Check("No Future Dates", lambda ctx: [
+            _future_date_result(stats['future_count'])]),
+        Check("Valid Customer IDs", lambda ctx: [
+            _customer_id_result(stats['invalid_customer_count'])]),
+        Check("Data Completeness Summary", lambda ctx: [_completeness_result(
+            row_count=row_count,
+            unique_customers=stats['unique_customers'],
+            type_counts={entry['TCTYPE']: entry['count'] for entry in stats['type_counts']},
+            date_min=stats['date_min'],
+            date_max=stats['date_max'],
+        )]),
+    ])
+    results.extend(runner.run({}))
     
     return ValidationReport(
         timestamp=datetime.now(),
@@ -324,7 +806,7 @@ def validate_source_data(df: pd.DataFrame) -> ValidationReport:
 # These checks run AFTER FIFO matching to verify results are correct.
 
 def validate_fifo_results(
-    original_df: pd.DataFrame, 
+    original_df: Optional[pd.DataFrame], 
     matched_df: pd.DataFrame
 ) -> ValidationReport:
     """
@@ -354,7 +836,9 @@ def validate_fifo_results(
     ==========================================================================
     
     PARAMETERS:
-        original_df: Raw data before FIFO matching
+        original_df: Raw data before FIFO matching. Every check below runs
+                     on matched_df alone, so callers that only have the
+                     matched output may pass None instead of loading it.
         matched_df: Data after FIFO matching (with REDEEMID column)
     
     RETURNS:
@@ -385,25 +869,40 @@ def validate_fifo_results(
             results=results
         )
     
+    # Other columns missing or no rows: report that and stop
+    early_report = _short_circuit(matched_df, REQUIRED_FIELDS, 'post_fifo', results)
+    if early_report is not None:
+        return early_report
+    
+    # Work on nullable Int64 IDs (the caller's frame is not modified), so
+    # the notna/isin/map calls below hash plain int64 values
+    matched_df = matched_df.assign(**_nullable_int_ids(matched_df, ['TRANS_ID', 'REDEEMID']))
+    
     # -------------------------------------------------------------------------
     # CHECK 2: REDEEMID Values Are Valid Transaction IDs
     # -------------------------------------------------------------------------
     # REDEEMIDs should reference actual spent/expired transactions.
     
-    valid_redemption_ids = set(
-        matched_df[matched_df['TCTYPE'].isin(['spent', 'expired'])]['TRANS_ID']
+    # Type masks are computed once and shared by every check below
+    is_type = _type_masks(matched_df['TCTYPE'])
+    is_redemption = is_type['spent'] | is_type['expired']
+    redeemid_assigned = matched_df['REDEEMID'].notna().to_numpy()
+    
+    # isin() hashes in C; only the failing values become Python objects
+    valid_redemption_ids = matched_df['TRANS_ID'][is_redemption]
+    assigned_redeemids = matched_df['REDEEMID'][redeemid_assigned]
+    invalid_redeemids = (
+        assigned_redeemids[~assigned_redeemids.isin(valid_redemption_ids)]
+        .unique().tolist()
     )
     
-    assigned_redeemids = set(matched_df['REDEEMID'].dropna())
-    invalid_redeemids = assigned_redeemids - valid_redemption_ids
-    
     results.append(ValidationResult(
         check_name="REDEEMID References Valid Transactions",
         passed=len(invalid_redeemids) == 0,
         message=f"Found {len(invalid_redeemids)} invalid REDEEMID values" if invalid_redeemids
                 else "All REDEEMID values reference valid spent/expired transactions",
         severity='ERROR',
-        details={'invalid_ids': list(invalid_redeemids)} if invalid_redeemids else None
+        details={'invalid_ids': invalid_redeemids} if invalid_redeemids else None
     ))
     
     # -------------------------------------------------------------------------
@@ -411,10 +910,7 @@ def validate_fifo_results(
     # -------------------------------------------------------------------------
     # Spent and expired transactions should NOT have REDEEMID values.
     
-    non_earned_with_redeemid = matched_df[
-        (matched_df['TCTYPE'] != 'earned') & 
-        (matched_df['REDEEMID'].notna())
-    ]
+    non_earned_with_redeemid = matched_df[~is_type['earned'] & redeemid_assigned]
     
     results.append(ValidationResult(
         check_name="Only Earned Transactions Have REDEEMID",
@@ -430,27 +926,31 @@ def validate_fifo_results(
     # -------------------------------------------------------------------------
     # Earned transactions should be matched to redemptions that happened AFTER.
     
-    chronological_errors = []
-    earned_with_redeemid = matched_df[
-        (matched_df['TCTYPE'] == 'earned') & 
-        (matched_df['REDEEMID'].notna())
-    ]
+    # Look up every redemption date in one vectorized .map against a
+    # TRANS_ID -> CREATEDAT series (first occurrence wins on duplicate IDs;
+    # REDEEMIDs with no matching transaction map to NaT and are skipped).
+    earned_with_redeemid = matched_df[is_type['earned'] & redeemid_assigned]
     
-    for _, earned_row in earned_with_redeemid.iterrows():
-        redeemid = earned_row['REDEEMID']
-        redemption_row = matched_df[matched_df['TRANS_ID'] == redeemid]
-        
-        if len(redemption_row) > 0:
-            redemption_date = redemption_row.iloc[0]['CREATEDAT']
-            earned_date = earned_row['CREATEDAT']
-            
-            if earned_date > redemption_date:
-                chronological_errors.append({
-                    'earned_id': earned_row['TRANS_ID'],
-                    'earned_date': str(earned_date),
-                    'redemption_id': redeemid,
-                    'redemption_date': str(redemption_date)
-                })
+    date_by_id = (
+        matched_df.drop_duplicates('TRANS_ID')
+        .set_index('TRANS_ID')['CREATEDAT']
+    )
+    redemption_dates = earned_with_redeemid['REDEEMID'].map(date_by_id)
+    out_of_order = earned_with_redeemid['CREATEDAT'] > redemption_dates
+    
+    bad_rows = earned_with_redeemid[out_of_order]
+    chronological_errors = [
+        {
+            'earned_id': earned_id,
+            'earned_date': str(earned_date),
+            'redemption_id': redeemid,
+            'redemption_date': str(redemption_date)
+        }
+        for earned_id, earned_date, redeemid, redemption_date in zip(
+            bad_rows['TRANS_ID'], bad_rows['CREATEDAT'],
+            bad_rows['REDEEMID'], redemption_dates[out_of_order]
+        )
+    ]
     
     results.append(ValidationResult(
         check_name="Chronological Consistency",
@@ -466,26 +966,26 @@ def validate_fifo_results(
     # -------------------------------------------------------------------------
     # For each customer, verify that the math adds up.
     
-    balance_errors = []
-    
-    for customer_id in matched_df['CUSTOMERID'].unique():
-        customer_df = matched_df[matched_df['CUSTOMERID'] == customer_id]
-        
-        total_earned = customer_df[customer_df['TCTYPE'] == 'earned']['AMOUNT'].sum()
-        total_spent = abs(customer_df[customer_df['TCTYPE'] == 'spent']['AMOUNT'].sum())
-        total_expired = abs(customer_df[customer_df['TCTYPE'] == 'expired']['AMOUNT'].sum())
-        
-        # Remaining balance should be non-negative
-        remaining = total_earned - total_spent - total_expired
-        
-        if remaining < -0.01:  # Small tolerance for floating point
-            balance_errors.append({
-                'customer_id': customer_id,
-                'total_earned': float(total_earned),
-                'total_spent': float(total_spent),
-                'total_expired': float(total_expired),
-                'remaining': float(remaining)
-            })
+    # One groupby computes all three totals for every customer at once
+    # (customers stay in order of first appearance).
+    amount = matched_df['AMOUNT']
+    totals = pd.DataFrame({
+        'total_earned': amount.where(is_type['earned'], 0.0),
+        'total_spent': amount.where(is_type['spent'], 0.0),
+        'total_expired': amount.where(is_type['expired'], 0.0),
+    }).groupby(matched_df['CUSTOMERID'], sort=False).sum()
+    totals['total_spent'] = totals['total_spent'].abs()
+    totals['total_expired'] = totals['total_expired'].abs()
+    
+    # Remaining balance should be non-negative
+    totals['remaining'] = totals['total_earned'] - totals['total_spent'] - totals['total_expired']
+    
+    balance_errors = (
+        totals[totals['remaining'] < -0.01]  # Small tolerance for floating point
+        .rename_axis('customer_id')
+        .reset_index()
+        .to_dict('records')
+    )
     
     results.append(ValidationResult(
         check_name="Customer Balance Reconciliation",
@@ -501,11 +1001,8 @@ def validate_fifo_results(
     # -------------------------------------------------------------------------
     # Informational summary of the matching results.
     
-    total_earned = len(matched_df[matched_df['TCTYPE'] == 'earned'])
-    matched_earned = len(matched_df[
-        (matched_df['TCTYPE'] == 'earned') & 
-        (matched_df['REDEEMID'].notna())
-    ])
+    total_earned = int(is_type['earned'].sum())
+    matched_earned = int((is_type['earned'] & redeemid_assigned).sum())
     unmatched_earned = total_earned - matched_earned
     
     results.append(ValidationResult(
@@ -37,9 +37,17 @@ DATE: 2024
 
 import pandas as pd
 import numpy as np
-from typing import Tuple, Optional
+from typing import Any, Dict, Iterator, List, Tuple, Optional
 from datetime import datetime
 import logging
+import os
+
+# Works both as part of the src package (src.fifo_matching) and with src/
+# itself on sys.path (tests, the DAG, running this file directly)
+try:
+    from .jit import can_cache, njit, prange
+except ImportError:
+    from jit import can_cache, njit, prange
 
 # -----------------------------------------------------------------------------
 # LOGGING CONFIGURATION
@@ -53,16 +61,231 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def open_workbook(filepath: str) -> pd.ExcelFile:
+    """
+    Open an Excel workbook once so several sheets can be parsed from it.
+    
+    WHAT THIS DOES:
+        Prefers the Rust-backed calamine engine, which is several times
+        faster than openpyxl on large .xlsx files. Falls back to openpyxl
+        when the python-calamine wheel is not installed.
+    
+    PARAMETERS:
+        filepath: Path to the Excel file (e.g., 'data/tc_raw_data.xlsx')
+    
+    RETURNS:
+        pd.ExcelFile handle - use it as a context manager and call
+        .parse(sheet_name) for each sheet that is needed.
+    
+    EXAMPLE:
+        >>> with open_workbook('data/tc_raw_data.xlsx') as xl:
+        ...     tc_data = xl.parse('TC_Data')
+        ...     sales = xl.parse('Sales')
+    """
+    try:
+        return pd.ExcelFile(filepath, engine='calamine')
+    except ImportError:
+        logger.info("python-calamine not installed, falling back to openpyxl")
+        return pd.ExcelFile(filepath, engine='openpyxl')
+
+
+def _normalise_cell(value):
+    """Convert one openpyxl cell value the way pandas' Excel reader does."""
+    if value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def iter_sheet_chunks(
+    filepath: str,
+    sheet_name: str,
+    usecols: Optional[List[str]] = None,
+    dtype: Optional[Dict[str, str]] = None,
+    chunk_size: int = 50_000
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream an Excel sheet as a series of DataFrames with bounded memory.
+    
+    WHAT THIS DOES:
+        Opens the workbook with openpyxl in read-only mode, which parses
+        the sheet XML lazily instead of building the whole worksheet in
+        memory, and yields DataFrames of at most chunk_size rows. Only one
+        chunk of rows is ever held as Python objects at a time.
+        
+        Use this for very large workbooks when calamine is unavailable;
+        open_workbook() is faster whenever the sheet fits in memory.
+    
+    PARAMETERS:
+        filepath: Path to the Excel file
+        sheet_name: Sheet to read; the first row must be the header
+        usecols: Optional list of column names to keep
+        dtype: Optional {column: dtype} applied to every chunk
+        chunk_size: Maximum rows per yielded DataFrame
+    
+    YIELDS:
+        pd.DataFrame chunks, in sheet order. A sheet with a header but no
+        data rows yields one empty chunk, so callers still see the columns
+        and dtypes.
+    """
+    from openpyxl import load_workbook
+    
+    wb = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        rows = wb[sheet_name].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        keep = [i for i, col in enumerate(header) if usecols is None or col in usecols]
+        columns = [header[i] for i in keep]
+        
+        def to_frame(records):
+            chunk = pd.DataFrame.from_records(records, columns=columns)
+            return chunk.astype(dtype) if dtype else chunk
+        
+        batch = []
+        yielded = False
+        for row in rows:
+            # Read-only mode drops trailing empty cells, so rows can be short.
+            # Cells are normalised the way pd.read_excel does it: blank
+            # strings become None and whole-number floats become ints.
+            values = tuple(
+                _normalise_cell(row[i] if i < len(row) else None) for i in keep
+            )
+            if all(v is None for v in values):
+                continue  # blank row, skipped like pd.read_excel does
+            batch.append(values)
+            if len(batch) >= chunk_size:
+                yield to_frame(batch)
+                yielded = True
+                batch = []
+        if batch or not yielded:
+            yield to_frame(batch)
+    finally:
+        wb.close()
+
+
+def tc_data_arrow_schema(columns: Optional[List[str]] = None) -> Any:
+    """
+    The Arrow schema of a staged TC_Data sheet.
+    
+    WHAT THIS IS:
+        Fixed column types for writing TC_Data in chunks, so a column that
+        happens to be empty in the first chunk (ORDERID and REASON exist
+        only on spent rows) is not typed as null. IDs are int64 (null IDs
+        stay null), dates are microsecond timestamps and TCTYPE is an
+        int32-indexed dictionary, matching what the other stagers write.
+    
+    PARAMETERS:
+        columns: Optional subset of columns to keep, in this order
+    
+    RETURNS:
+        pyarrow.Schema
+    """
+    import pyarrow as pa
+    
+    types = {
+        'TRANS_ID': pa.int64(),
+        'TCTYPE': pa.dictionary(pa.int32(), pa.string()),
+        'CREATEDAT': pa.timestamp('us'),
+        'EXPIREDAT': pa.timestamp('us'),
+        'CUSTOMERID': pa.int64(),
+        'ORDERID': pa.int64(),
+        'AMOUNT': pa.float64(),
+        'REASON': pa.large_string(),
+    }
+    return pa.schema([(name, types[name]) for name in (columns or types)])
+
+
+def write_parquet_chunks(
+    chunks: Iterator[pd.DataFrame],
+    output_path: str,
+    schema: Optional[Any] = None
+) -> int:
+    """
+    Write a stream of DataFrame chunks to one parquet file.
+    
+    WHAT THIS DOES:
+        Each chunk becomes a zstd-compressed row group, cast to one schema.
+        With an explicit schema every chunk is cast to it as it arrives.
+        Without one the schema is inferred, with categorical columns
+        widened to int32 dictionary indices; chunks are held back while
+        any column is still all-null, so its real type comes from the
+        first chunk that has values rather than the first chunk overall.
+        
+        The file is written under a temporary name and swapped in at the
+        end, and the temporary file is removed if anything fails.
+    
+    PARAMETERS:
+        chunks: DataFrames with the same columns, e.g. from iter_sheet_chunks
+        output_path: Where to write the parquet file
+        schema: Optional pyarrow.Schema to cast every chunk to
+    
+    RETURNS:
+        Number of rows written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    def widen(table_schema):
+        return pa.schema([
+            field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+            if pa.types.is_dictionary(field.type) else field
+            for field in table_schema
+        ])
+    
+    tmp_path = f"{output_path}.tmp"
+    writer = None
+    pending = []
+    rows = 0
+    
+    def flush(target_schema):
+        nonlocal writer
+        if writer is None:
+            writer = pq.ParquetWriter(tmp_path, target_schema, compression='zstd')
+        for table in pending:
+            writer.write_table(table.select(target_schema.names).cast(target_schema))
+        pending.clear()
+    
+    try:
+        for chunk in chunks:
+            rows += len(chunk)
+            pending.append(pa.Table.from_pandas(chunk, preserve_index=False))
+            if schema is None:
+                inferred = pa.unify_schemas([widen(t.schema) for t in pending],
+                                            promote_options='permissive')
+                if any(pa.types.is_null(field.type) for field in inferred):
+                    continue
+                schema = inferred
+            flush(schema)
+        if schema is None:
+            # Columns that never had a value stay null-typed
+            schema = pa.unify_schemas([widen(t.schema) for t in pending],
+                                      promote_options='permissive') if pending else pa.schema([])
+        flush(schema)
+        writer.close()
+        writer = None
+        os.replace(tmp_path, output_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    return rows
+
+
 def load_tc_data(filepath: str) -> pd.DataFrame:
     """
-    Load Thrive Cash transaction data from an Excel file.
+    Load Thrive Cash transaction data from an Excel or parquet file.
     
     WHAT THIS DOES:
-        Reads the TC_Data sheet from the Excel file and prepares it
-        for processing by ensuring correct data types.
+        Reads the TC_Data sheet from the Excel file (or a parquet copy of
+        it staged by the DAG) and prepares it for processing by ensuring
+        correct data types. The reader is chosen from the file extension.
     
     PARAMETERS:
         filepath: Path to the Excel file (e.g., 'data/tc_raw_data.xlsx')
+                  or to a staged parquet copy of the TC_Data sheet
     
     RETURNS:
         DataFrame with columns:
@@ -75,18 +298,40 @@ def load_tc_data(filepath: str) -> pd.DataFrame:
         - AMOUNT: Transaction amount (positive for earned, negative for spent/expired)
         - REASON: Why the transaction occurred (refund, promotion, etc.)
     
+    PARQUET COPIES:
+        Given an .xlsx path, a parquet file next to it with the same name
+        (written by convert_xlsx_to_parquet) is read instead, as long as
+        it is at least as new as the workbook.
+    
     EXAMPLE:
         >>> df = load_tc_data('data/tc_raw_data.xlsx')
         >>> print(df.head())
     """
+    if filepath.endswith('.xlsx'):
+        parquet_path = filepath[:-len('.xlsx')] + '.parquet'
+        if (os.path.exists(parquet_path)
+                and os.path.getmtime(parquet_path) >= os.path.getmtime(filepath)):
+            filepath = parquet_path
+    
     logger.info(f"Loading TC data from: {filepath}")
     
-    # Read the Excel file, specifically the TC_Data sheet
-    df = pd.read_excel(filepath, sheet_name='TC_Data')
+    if filepath.endswith('.parquet'):
+        # Staged copy - columnar, typed and much faster than re-parsing xlsx
+        df = pd.read_parquet(filepath)
+    else:
+        # Read the Excel file, specifically the TC_Data sheet
+        with open_workbook(filepath) as xl:
+            df = xl.parse('TC_Data')
     
     # Ensure CREATEDAT is a proper datetime for sorting
     # This is critical for FIFO - we need accurate chronological ordering
-    df['CREATEDAT'] = pd.to_datetime(df['CREATEDAT'])
+    # (parquet copies already store it typed)
+    if not pd.api.types.is_datetime64_any_dtype(df['CREATEDAT']):
+        df['CREATEDAT'] = pd.to_datetime(df['CREATEDAT'])
+    
+    # Three distinct values: stored as small integer codes, so the type
+    # comparisons in matching and validation compare codes, not strings
+    df['TCTYPE'] = df['TCTYPE'].astype('category')
     
     # Log summary statistics for visibility
     logger.info(f"Loaded {len(df)} transactions")
@@ -96,6 +341,73 @@ def load_tc_data(filepath: str) -> pd.DataFrame:
     return df
 
 
+def convert_xlsx_to_parquet(source_path: str, output_path: Optional[str] = None) -> str:
+    """
+    Write the TC_Data sheet of a workbook to a parquet file, once.
+    
+    WHAT THIS DOES:
+        Parses the sheet (calamine when available), types CREATEDAT as a
+        datetime and writes zstd-compressed parquet with dictionary
+        encoding for the repetitive text columns. load_tc_data() then
+        picks the parquet up automatically, skipping the Excel parse.
+    
+    PARAMETERS:
+        source_path: Path to the Excel file
+        output_path: Where to write; defaults to source_path with a
+                     .parquet extension (where load_tc_data looks)
+    
+    RETURNS:
+        The path written
+    
+    EXAMPLE:
+        >>> convert_xlsx_to_parquet('data/tc_raw_data.xlsx')
+        'data/tc_raw_data.parquet'
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    if output_path is None:
+        output_path = os.path.splitext(source_path)[0] + '.parquet'
+    
+    with open_workbook(source_path) as xl:
+        df = xl.parse('TC_Data')
+    df['CREATEDAT'] = pd.to_datetime(df['CREATEDAT'])
+    
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    dictionary_columns = [name for name in ('TCTYPE', 'REASON') if name in table.column_names]
+    
+    # Write to a temp file and swap it in, so readers never see half a file
+    tmp_path = f"{output_path}.tmp"
+    pq.write_table(table, tmp_path, compression='zstd', use_dictionary=dictionary_columns)
+    os.replace(tmp_path, output_path)
+    
+    logger.info(f"Wrote {len(df)} TC_Data rows to {output_path}")
+    return output_path
+
+
+# Integer codes for the transaction types (see transaction_type_codes)
+EARNED, SPENT, EXPIRED = 0, 1, 2
+
+
+def transaction_type_codes(tctype: pd.Series) -> np.ndarray:
+    """
+    Recode TCTYPE to EARNED / SPENT / EXPIRED, or -1 for anything else.
+    
+    The column is factorized once (for a categorical column that is just
+    its codes) and only its handful of distinct values are compared as
+    strings, so callers test types with integer comparisons instead of
+    string comparisons over every row. The codes are int8: an eighth of
+    the memory of int64, so the masks and kernels reading them stream
+    through much less data.
+    """
+    value_codes, values = pd.factorize(tctype)
+    recode = pd.Index(['earned', 'spent', 'expired']).get_indexer(values)
+    # Nulls get value code -1, which picks the trailing -1. The lookup
+    # table is narrowed before the gather, so no full-size int64 array
+    # is ever built.
+    return np.append(recode, -1).astype(np.int8)[value_codes]
+
+
 def perform_fifo_matching(df: pd.DataFrame) -> pd.DataFrame:
     """
     Perform FIFO matching of spent/expired transactions to earned transactions.
@@ -120,12 +432,22 @@ def perform_fifo_matching(df: pd.DataFrame) -> pd.DataFrame:
     TECHNICAL DETAILS:
     ==========================================================================
     
-    The algorithm processes each customer independently:
-    1. Filter transactions for one customer
-    2. Separate into "earned" vs "spent/expired" buckets
-    3. Sort earned by CREATEDAT ascending (oldest first)
-    4. For each spent/expired transaction, assign to next available earned
-    5. Handle partial matches (when amounts don't align perfectly)
+    The frame is never filtered per customer. Instead:
+    1. Recode TCTYPE to integer type codes and number customers in order
+       of first appearance (pd.factorize)
+    2. Put every earned/spent/expired row with a customer in one global
+       order with a single np.lexsort: by customer, then earned before
+       spent/expired, then CREATEDAT (missing dates last). Each customer
+       is now two contiguous blocks - earned, then redemptions
+    3. _fifo_match_kernel() walks those blocks over flat NumPy arrays,
+       compiled by Numba when installed, with customers spread across
+       cores by prange. For each redemption in date order it consumes the
+       oldest unused earned rows whole until the amount is covered,
+       skipping earned rows dated after the redemption
+    4. Write REDEEMID back in one vectorized assignment
+    
+    If the input has no earned or no spent/expired rows, nothing can
+    match and steps 2-3 are skipped.
     
     PARAMETERS:
         df: DataFrame with TC_Data columns (see load_tc_data for schema)
@@ -133,157 +455,284 @@ def perform_fifo_matching(df: pd.DataFrame) -> pd.DataFrame:
     RETURNS:
         DataFrame with new REDEEMID column added to earned transactions.
         REDEEMID contains the TRANS_ID of the spent/expired transaction
-        that redeemed this earned transaction.
+        that redeemed this earned transaction (nullable Int64, missing
+        where nothing redeemed it).
     
     SCALABILITY NOTE:
-        This implementation uses vectorized operations where possible
-        and processes customers in batches. For millions of transactions,
-        consider using SQL window functions in Snowflake instead.
+        Cost is one O(n log n) sort plus one linear pass of the kernel;
+        there is no Python code per customer or per row. Without Numba
+        the kernel runs as plain Python and is much slower (see jit.py).
     """
-    logger.info("Starting FIFO matching process...")
-    
-    # Create a copy to avoid modifying the original data
-    # This is a best practice for data pipelines
-    result_df = df.copy()
-    
-    # Initialize the REDEEMID column with None (null values)
-    # Only earned transactions will get a REDEEMID assigned
-    result_df['REDEEMID'] = None
+    result_df, _ = perform_fifo_matching_with_stats(df)
+    return result_df
+
+
+def perform_fifo_matching_with_stats(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Perform FIFO matching and return the matching statistics alongside.
     
-    # Get list of unique customers to process
-    customers = result_df['CUSTOMERID'].unique()
-    logger.info(f"Processing {len(customers)} customers...")
+    WHAT THIS DOES:
+        Same matching as perform_fifo_matching(). The statistics are
+        counted while matching, so callers that report them (like the DAG)
+        don't need to scan the result again.
+    
+    HOW:
+        Rather than filtering the frame once per customer, every row is
+        put in one global order - by customer, then earned before
+        spent/expired, then date - so each customer's earned and
+        redemption transactions are two contiguous blocks of plain NumPy
+        arrays. _fifo_match_kernel() then walks those blocks with a
+        cursor (compiled by Numba when available), and REDEEMID is
+        written back in one assignment.
     
-    # Track statistics for logging and validation
-    total_matches = 0
-    unmatched_redemptions = 0
+    RETURNS:
+        Tuple of (result_df, stats) where stats has:
+        - total_transactions: Rows in the input
+        - total_earned: Earned transactions in the input
+        - matched_earned: Earned transactions that were given a REDEEMID
+        - unmatched_redemptions: Spent/expired not fully covered by earned
+        - match_rate: matched_earned / total_earned as a percentage string
+    """
+    logger.info("Starting FIFO matching process...")
     
     # ---------------------------------------------------------------------
-    # PROCESS EACH CUSTOMER INDEPENDENTLY
+    # ONE GLOBAL ORDER: CUSTOMER, THEN EARNED/REDEMPTION, THEN DATE
     # ---------------------------------------------------------------------
     # FIFO matching is done per-customer because each customer has their
     # own Thrive Cash balance that is independent of other customers.
+    # Customers are numbered in order of first appearance; rows without a
+    # customer (code -1) are never matched.
     
-    for customer_id in customers:
-        logger.debug(f"Processing customer: {customer_id}")
-        
-        # Get all transactions for this customer
-        customer_mask = result_df['CUSTOMERID'] == customer_id
-        customer_df = result_df[customer_mask].copy()
+    customer_codes, customers = pd.factorize(df['CUSTOMERID'])
+    logger.info(f"Processing {len(customers)} customers...")
+    
+    # Earned = money coming IN, spent/expired = money going OUT.
+    # Role 0 = earned, 1 = redemption; other types take no part.
+    tctype = df['TCTYPE']
+    type_codes = transaction_type_codes(tctype)
+    is_earned = type_codes == EARNED
+    is_redemption = (type_codes == SPENT) | (type_codes == EXPIRED)
+    role = np.where(is_earned, 0, 1)
+    take_part = (customer_codes >= 0) & (is_earned | is_redemption)
+    
+    # Matching needs both sides. Checked on the type masks alone, so the
+    # edge cases (and inputs with one side missing) cost no sort at all.
+    if is_earned.any() and is_redemption.any():
+        # Dates as int64 nanoseconds. Missing dates sort last (as sort_values
+        # would put them) and are flagged for the kernel's comparisons.
+        created_at = pd.to_datetime(df['CREATEDAT']).to_numpy(dtype='datetime64[ns]')
+        created_at_missing = np.isnat(created_at)
+        created_at_ns = np.where(created_at_missing, np.iinfo(np.int64).max,
+                                 created_at.view(np.int64))
         
-        # -------------------------------------------------------------
-        # SEPARATE EARNED VS SPENT/EXPIRED TRANSACTIONS
-        # -------------------------------------------------------------
-        # Earned = money coming IN (positive amounts)
-        # Spent/Expired = money going OUT (negative amounts)
+        # np.lexsort is stable and sorts by its LAST key first
+        rows = np.flatnonzero(take_part)
+        order = rows[np.lexsort((created_at_ns[rows], role[rows], customer_codes[rows]))]
         
-        earned_mask = customer_df['TCTYPE'] == 'earned'
-        redemption_mask = customer_df['TCTYPE'].isin(['spent', 'expired'])
+        # Block boundaries: customer c's earned rows are
+        # [block_starts[2c], block_starts[2c+1]) and its redemptions run on
+        # to block_starts[2c+2]
+        block_keys = customer_codes[order] * 2 + role[order]
+        block_starts = np.searchsorted(block_keys, np.arange(2 * len(customers) + 1))
         
-        # Get earned transactions, sorted by date (OLDEST FIRST - this is the FIFO part!)
-        earned_txns = customer_df[earned_mask].sort_values('CREATEDAT').copy()
+        amounts = df['AMOUNT'].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+        matched_to = np.full(len(order), -1, dtype=np.int64)
+        remaining = np.zeros(len(order), dtype=np.float64)
         
-        # Get spent/expired transactions (redemptions), sorted by date
-        redemption_txns = customer_df[redemption_mask].sort_values('CREATEDAT')
+        _fifo_match_kernel(
+            block_starts, created_at_ns[order], created_at_missing[order],
+            amounts, matched_to, remaining
+        )
+    else:
+        # Only earned or only spent/expired rows: nothing can be matched,
+        # so skip the date conversion, the sort and the kernel
+        order = np.empty(0, dtype=np.intp)
+        matched_to = np.empty(0, dtype=np.int64)
+        remaining = np.empty(0, dtype=np.float64)
+    
+    # ---------------------------------------------------------------------
+    # WRITE REDEEMID BACK IN ONE ASSIGNMENT
+    # ---------------------------------------------------------------------
+    # Only earned transactions get a REDEEMID: the TRANS_ID of the
+    # spent/expired transaction that consumed them. Everything else is
+    # missing. The column is nullable Int64 - an int64 buffer plus a null
+    # mask - rather than an object array of boxed ints and None.
+    
+    matched = matched_to >= 0
+    trans_ids = df['TRANS_ID'].to_numpy()
+    earned_rows = order[matched]
+    redemption_ids = trans_ids[order[matched_to[matched]]]
+    
+    try:
+        redemption_ids = pd.array(redemption_ids, dtype='Int64')
+    except (TypeError, ValueError):
+        # TRANS_IDs that aren't whole numbers are passed through as they are
+        redeemid = np.full(len(df), None, dtype=object)
+        redeemid[earned_rows] = redemption_ids
+    else:
+        values = np.zeros(len(df), dtype=np.int64)
+        missing = np.ones(len(df), dtype=bool)
+        values[earned_rows] = redemption_ids.to_numpy(dtype=np.int64, na_value=0)
+        missing[earned_rows] = redemption_ids.isna()
+        redeemid = pd.arrays.IntegerArray(values, missing)
+    
+    # The input is never modified. assign() returns a new frame that
+    # shares the input's columns under copy-on-write (pandas 3), so only
+    # the REDEEMID column is new memory.
+    result_df = df.assign(REDEEMID=redeemid)
+    
+    # Redemptions the customer's earned balance couldn't cover
+    # (small tolerance for floating point)
+    unmatched = np.flatnonzero(remaining > 0.01)
+    if len(unmatched) and logger.isEnabledFor(logging.WARNING):
+        rows = order[unmatched]
+        for customer_id, txn_type, txn_id, amount_left in zip(
+            df['CUSTOMERID'].to_numpy()[rows], tctype.to_numpy()[rows],
+            trans_ids[rows], remaining[unmatched]
+        ):
+            logger.warning(
+                f"Customer {customer_id}: Could not fully match "
+                f"{txn_type} {txn_id} (${amount_left:.2f} unmatched)"
+            )
+    
+    # ---------------------------------------------------------------------
+    # LOG SUMMARY STATISTICS
+    # ---------------------------------------------------------------------
+    # Each earned transaction leaves the pool once matched, so every match
+    # is exactly one earned transaction with a REDEEMID
+    total_earned = int((is_earned & (customer_codes >= 0)).sum())
+    total_matches = int(matched.sum())
+    unmatched_redemptions = len(unmatched)
+    
+    logger.info(f"FIFO matching complete!")
+    logger.info(f"  Total matches made: {total_matches}")
+    logger.info(f"  Redemptions with unmatched amounts: {unmatched_redemptions}")
+    logger.info(f"  Earned transactions with REDEEMID: {total_matches}")
+    
+    stats = {
+        'total_transactions': len(result_df),
+        'total_earned': total_earned,
+        'matched_earned': total_matches,
+        'unmatched_redemptions': unmatched_redemptions,
+        'match_rate': f"{(total_matches/total_earned*100):.1f}%" if total_earned > 0 else "N/A",
+    }
+    
+    return result_df, stats
+
+
+# Explicit signature: compiled (or loaded from the on-disk cache) when
+# the module is imported rather than on the first call, and only ever
+# for these contiguous array types. fastmath is deliberately off - it
+# assumes no NaNs, and a NaN amount has to keep matching (see below).
+@njit(
+    'void(int64[::1], int64[::1], boolean[::1], float64[::1], int64[::1], float64[::1])',
+    cache=can_cache(__name__), parallel=True
+)
+def _fifo_match_kernel(
+    block_starts: np.ndarray,
+    created_at_ns: np.ndarray,
+    created_at_missing: np.ndarray,
+    amounts: np.ndarray,
+    matched_to: np.ndarray,
+    remaining: np.ndarray
+) -> None:
+    """
+    FIFO-match every customer's redemptions to their earned transactions.
+    
+    All arrays are in the global order built by
+    perform_fifo_matching_with_stats(): per customer, a block of earned
+    rows then a block of spent/expired rows, each sorted by date with
+    missing dates last.
+    
+    For each redemption, the oldest earned rows not yet used are consumed
+    whole until the redemption's amount is covered. An earned row dated
+    after the redemption can't be used for it - you can't redeem credits
+    you haven't earned yet. Because earned rows are sorted, the unused
+    ones are always a run starting at a cursor, so no pool of indices has
+    to be searched or trimmed. A missing date never compares as "after",
+    so undated earned rows (a second cursor) are always usable.
+    
+    Results are written in place: matched_to[earned] = position of the
+    redemption that consumed it (-1 if none), remaining[redemption] =
+    amount left uncovered.
+    
+    Compiled with Numba when it is installed (see jit.py) - the loop
+    carries state from row to row, so it can't be vectorized, but it only
+    touches flat int64/float64/bool arrays. Customers are independent and
+    each only writes inside its own blocks, so they are spread across
+    cores with prange.
+    """
+    n_customers = (len(block_starts) - 1) // 2
+    
+    for customer in prange(n_customers):
+        earned_start = block_starts[2 * customer]
+        earned_end = block_starts[2 * customer + 1]
+        redemption_end = block_starts[2 * customer + 2]
         
-        if len(earned_txns) == 0 or len(redemption_txns) == 0:
+        if earned_start == earned_end or earned_end == redemption_end:
             # Nothing to match for this customer
             continue
         
-        # -------------------------------------------------------------
-        # FIFO MATCHING LOOP
-        # -------------------------------------------------------------
-        # For each redemption (spent/expired), find the oldest unmatched
-        # earned transaction and link them together.
+        # Undated earned rows sit at the end of the block
+        undated_start = earned_start
+        while undated_start < earned_end and not created_at_missing[undated_start]:
+            undated_start += 1
         
-        # Track which earned transactions have been matched
-        # Using a list of indices that are still available
-        available_earned_indices = list(earned_txns.index)
+        dated_cursor = earned_start
+        undated_cursor = undated_start
         
-        for _, redemption in redemption_txns.iterrows():
-            redemption_id = redemption['TRANS_ID']
-            redemption_amount = abs(redemption['AMOUNT'])  # Make positive for comparison
-            redemption_date = redemption['CREATEDAT']
-            
-            # Track how much of this redemption we still need to match
-            remaining_to_match = redemption_amount
+        for redemption in range(earned_end, redemption_end):
+            # Make positive for comparison
+            remaining_to_match = abs(amounts[redemption])
+            redemption_undated = created_at_missing[redemption]
             
-            # Try to match to available earned transactions (FIFO order)
-            indices_to_remove = []
-            
-            for earned_idx in available_earned_indices:
-                if remaining_to_match <= 0:
+            # "not <= 0" rather than "> 0": a NaN amount keeps matching
+            while dated_cursor < undated_start and not remaining_to_match <= 0:
+                if not redemption_undated and created_at_ns[dated_cursor] > created_at_ns[redemption]:
                     break
-                    
-                earned_row = earned_txns.loc[earned_idx]
-                earned_amount = earned_row['AMOUNT']
-                earned_date = earned_row['CREATEDAT']
-                
-                # IMPORTANT: Only match if earned transaction is BEFORE the redemption
-                # You can't redeem credits you haven't earned yet!
-                if earned_date > redemption_date:
-                    continue
-                
-                # Match this earned transaction to the redemption
-                # Set REDEEMID on the earned transaction
-                result_df.loc[earned_idx, 'REDEEMID'] = redemption_id
-                
-                # Update tracking
-                remaining_to_match -= earned_amount
-                indices_to_remove.append(earned_idx)
-                total_matches += 1
-                
-                logger.debug(
-                    f"  Matched earned {earned_row['TRANS_ID']} (${earned_amount}) "
-                    f"to {redemption['TCTYPE']} {redemption_id}"
-                )
+                matched_to[dated_cursor] = redemption
+                remaining_to_match -= amounts[dated_cursor]
+                dated_cursor += 1
             
-            # Remove matched earned transactions from available pool
-            for idx in indices_to_remove:
-                available_earned_indices.remove(idx)
+            while undated_cursor < earned_end and not remaining_to_match <= 0:
+                matched_to[undated_cursor] = redemption
+                remaining_to_match -= amounts[undated_cursor]
+                undated_cursor += 1
             
-            # Check if we couldn't fully match this redemption
-            if remaining_to_match > 0.01:  # Small tolerance for floating point
-                unmatched_redemptions += 1
-                logger.warning(
-                    f"Customer {customer_id}: Could not fully match "
-                    f"{redemption['TCTYPE']} {redemption_id} "
-                    f"(${remaining_to_match:.2f} unmatched)"
-                )
-    
-    # ---------------------------------------------------------------------
-    # LOG SUMMARY STATISTICS
-    # ---------------------------------------------------------------------
-    logger.info(f"FIFO matching complete!")
-    logger.info(f"  Total matches made: {total_matches}")
-    logger.info(f"  Redemptions with unmatched amounts: {unmatched_redemptions}")
-    
-    matched_earned = result_df[result_df['REDEEMID'].notna()]
-    logger.info(f"  Earned transactions with REDEEMID: {len(matched_earned)}")
-    
-    return result_df
+            remaining[redemption] = remaining_to_match
 
 
 def save_results(df: pd.DataFrame, output_path: str) -> None:
     """
-    Save the matched results to a CSV file.
+    Save the matched results to a CSV or parquet file.
     
     WHAT THIS DOES:
-        Exports the DataFrame with REDEEMID column to a CSV file
-        for downstream processing or review.
+        Exports the DataFrame with REDEEMID column for downstream
+        processing or review. The format is chosen from the extension:
+        '.parquet' keeps native dtypes (datetimes stay datetime64, so
+        readers don't re-parse them); '.feather' writes an uncompressed
+        Arrow IPC file that readers can memory-map with no decoding at
+        all; anything else is written as CSV.
     
     PARAMETERS:
         df: DataFrame with FIFO matching results
-        output_path: Where to save the CSV (e.g., 'output/tc_data_with_redemptions.csv')
+        output_path: Where to save the file (e.g., 'output/tc_data_with_redemptions.csv')
     
     OUTPUT FILE FORMAT:
-        CSV with columns: TRANS_ID, TCTYPE, CREATEDAT, EXPIREDAT, 
-                         CUSTOMERID, ORDERID, AMOUNT, REASON, REDEEMID
+        Columns: TRANS_ID, TCTYPE, CREATEDAT, EXPIREDAT, 
+                 CUSTOMERID, ORDERID, AMOUNT, REASON, REDEEMID
     """
     logger.info(f"Saving results to: {output_path}")
     
-    # Save to CSV with a clean format
-    df.to_csv(output_path, index=False, date_format='%Y-%m-%d %H:%M:%S')
+    if output_path.endswith('.parquet'):
+        df.to_parquet(output_path, compression='zstd', index=False)
+    elif output_path.endswith('.feather'):
+        # Uncompressed so pyarrow.feather.read_table(memory_map=True) can
+        # hand out the column buffers without copying them
+        df.reset_index(drop=True).to_feather(output_path, compression='uncompressed')
+    else:
+        # Save to CSV with a clean format
+        df.to_csv(output_path, index=False, date_format='%Y-%m-%d %H:%M:%S')
     
     logger.info(f"Successfully saved {len(df)} rows to {output_path}")
 
@@ -291,7 +740,7 @@ def save_results(df: pd.DataFrame, output_path: str) -> None:
 def run_fifo_matching_pipeline(
     input_path: str = 'data/tc_raw_data.xlsx',
     output_path: str = 'output/tc_data_with_redemptions.csv'
-) -> pd.DataFrame:
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     """
     Run the complete FIFO matching pipeline from start to finish.
     
@@ -313,14 +762,15 @@ def run_fifo_matching_pipeline(
     
     From Python:
         from src.fifo_matching import run_fifo_matching_pipeline
-        result = run_fifo_matching_pipeline()
+        result, stats = run_fifo_matching_pipeline()
     
     PARAMETERS:
         input_path: Path to source Excel file
-        output_path: Path for output CSV file
+        output_path: Path for output file (.csv, .parquet or .feather)
     
     RETURNS:
-        DataFrame with FIFO matching results
+        Tuple of (DataFrame with FIFO matching results, matching stats) -
+        see perform_fifo_matching_with_stats for the stats keys
     """
     logger.info("=" * 60)
     logger.info("THRIVE CASH FIFO MATCHING PIPELINE")
@@ -330,7 +780,7 @@ def run_fifo_matching_pipeline(
     df = load_tc_data(input_path)
     
     # Step 2: Perform FIFO matching
-    result_df = perform_fifo_matching(df)
+    result_df, stats = perform_fifo_matching_with_stats(df)
     
     # Step 3: Save results
     save_results(result_df, output_path)
@@ -339,7 +789,7 @@ def run_fifo_matching_pipeline(
     logger.info("PIPELINE COMPLETE")
     logger.info("=" * 60)
     
-    return result_df
+    return result_df, stats
 
 
 # =============================================================================
@@ -350,7 +800,7 @@ def run_fifo_matching_pipeline(
 
 if __name__ == '__main__':
     # Run the pipeline with default paths
-    result = run_fifo_matching_pipeline()
+    result, stats = run_fifo_matching_pipeline()
     
     # Print a summary of results
     print("\n" + "=" * 60)
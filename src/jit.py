@@ -0,0 +1,77 @@
+"""
+=============================================================================
+OPTIONAL NUMBA JIT COMPILATION
+=============================================================================
+
+PURPOSE:
+    Some steps (like the FIFO matching kernel) are sequential loops over
+    NumPy arrays that can't be written as whole-array operations, because
+    each step depends on the previous one. Numba compiles such loops to
+    machine code; without it they run as ordinary Python.
+
+HOW TO USE:
+    from jit import can_cache, njit, prange
+
+    @njit(cache=can_cache(__name__), parallel=True)
+    def kernel(values, out):
+        for i in prange(len(values)):  # iterations split across cores
+            ...
+
+    The kernel must stick to what Numba supports (NumPy arrays, scalars,
+    plain loops) so it behaves the same either way.
+
+    Iterations of a prange loop may run in any order on any thread, so
+    each one must only write to its own part of the output arrays.
+
+    Passing a signature string first, e.g. @njit('void(int64[::1])'),
+    compiles when the module is imported instead of on the first call,
+    and only for exactly those argument types.
+
+ON-DISK CACHE:
+    Numba names cache files after the source file, not the module. The
+    modules in src/ are imported two ways: as top-level modules with
+    src/ on sys.path (tests, the DAG, running a file directly) and as
+    the src package (src.fifo_matching). A kernel cached under one name
+    fails to load under the other. So kernels pass
+    cache=can_cache(__name__), which keeps the cache for top-level
+    imports only. Package imports compile at import instead.
+
+WHEN NUMBA IS MISSING:
+    njit becomes a no-op decorator, prange is plain range and
+    NUMBA_AVAILABLE is False. Results are identical, just slower on
+    large inputs.
+
+AUTHOR: Data Applications Team
+DATE: 2024
+=============================================================================
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    logger.info("numba not installed, compiled kernels will run as plain Python")
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit: return the function unchanged."""
+        # Used bare (@njit) the function is the only argument
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+    prange = range
+
+
+def can_cache(module_name: str) -> bool:
+    """
+    True when kernels defined in module_name may use Numba's disk cache.
+    
+    Only top-level module names (no package prefix) qualify - see
+    ON-DISK CACHE above.
+    """
+    return '.' not in module_name
@@ -24,8 +24,18 @@ DATE: 2024
 """
 
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import logging
+import os
+
+# Works both as part of the src package and with src/ on sys.path
+try:
+    from .fifo_matching import EARNED, EXPIRED, SPENT, transaction_type_codes
+    from .jit import NUMBA_AVAILABLE, can_cache, njit
+except ImportError:
+    from fifo_matching import EARNED, EXPIRED, SPENT, transaction_type_codes
+    from jit import NUMBA_AVAILABLE, can_cache, njit
 
 # Configure logging
 logging.basicConfig(
@@ -35,6 +45,37 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def load_matched_data(filepath: str = 'output/tc_data_with_redemptions.csv') -> pd.DataFrame:
+    """
+    Load FIFO-matched transactions written by save_results().
+    
+    WHAT THIS DOES:
+        Reads parquet when it is given a .parquet path, or when a parquet
+        copy with the same name sits next to the CSV and is at least as
+        new (or the CSV does not exist at all). Parquet is columnar and
+        keeps CREATEDAT typed, so nothing is re-parsed; the CSV path
+        parses CREATEDAT after reading.
+    
+    PARAMETERS:
+        filepath: Matched output, .csv or .parquet
+    
+    RETURNS:
+        DataFrame with the TC_Data columns plus REDEEMID
+    """
+    parquet_path = os.path.splitext(filepath)[0] + '.parquet'
+    if not filepath.endswith('.parquet') and os.path.exists(parquet_path) \
+            and (not os.path.exists(filepath)
+                 or os.path.getmtime(parquet_path) >= os.path.getmtime(filepath)):
+        filepath = parquet_path
+    
+    if filepath.endswith('.parquet'):
+        return pd.read_parquet(filepath)
+    
+    df = pd.read_csv(filepath)
+    df['CREATEDAT'] = pd.to_datetime(df['CREATEDAT'])
+    return df
+
+
 def build_customer_balance_history(df: pd.DataFrame) -> pd.DataFrame:
     """
     Build a customer balance history table showing running totals.
@@ -62,43 +103,102 @@ def build_customer_balance_history(df: pd.DataFrame) -> pd.DataFrame:
     """
     logger.info("Building customer balance history...")
     
-    balance_records = []
-    
-    for customer_id in df['CUSTOMERID'].unique():
-        # Get this customer's transactions sorted by date
-        customer_df = df[df['CUSTOMERID'] == customer_id].sort_values('CREATEDAT')
+    # Customers in order of first appearance, each customer's transactions
+    # by date (missing dates last). Rows without a customer are left out.
+    customer_codes = pd.factorize(df['CUSTOMERID'])[0]
+    history = (
+        df[customer_codes >= 0]
+        .assign(_customer=customer_codes[customer_codes >= 0])
+        .sort_values(['_customer', 'CREATEDAT'], kind='stable')
+        .reset_index(drop=True)
+    )
+    
+    amount = history['AMOUNT']
+    tctype = history['TCTYPE']
+    # One int8 recode shared by both paths below
+    type_codes = transaction_type_codes(tctype)
+    
+    if NUMBA_AVAILABLE:
+        # All four running figures from one compiled pass over the sorted
+        # rows, branching on integer type codes
+        n = len(history)
+        cumulative_earned = np.empty(n)
+        cumulative_spent = np.empty(n)
+        cumulative_expired = np.empty(n)
+        current_balance = np.empty(n)
         
-        # Initialize running totals
-        cumulative_earned = 0
-        cumulative_spent = 0
-        cumulative_expired = 0
+        _running_totals(
+            history['_customer'].to_numpy(), type_codes,
+            amount.to_numpy(dtype=np.float64, na_value=np.nan),
+            cumulative_earned, cumulative_spent, cumulative_expired, current_balance
+        )
+    else:
+        # Without Numba that loop would run as Python, so use one grouped
+        # cumsum per total instead (NaN amounts carry forward here too)
+        cumulative = pd.DataFrame({
+            'earned': amount.where(type_codes == EARNED, 0.0),
+            'spent': amount.abs().where(type_codes == SPENT, 0.0),
+            'expired': amount.abs().where(type_codes == EXPIRED, 0.0),
+        }).groupby(history['_customer'], sort=False).cumsum(skipna=False)
         
-        for _, row in customer_df.iterrows():
-            # Update running totals based on transaction type
-            if row['TCTYPE'] == 'earned':
-                cumulative_earned += row['AMOUNT']
-            elif row['TCTYPE'] == 'spent':
-                cumulative_spent += abs(row['AMOUNT'])
-            elif row['TCTYPE'] == 'expired':
-                cumulative_expired += abs(row['AMOUNT'])
-            
-            # Calculate current balance
-            current_balance = cumulative_earned - cumulative_spent - cumulative_expired
-            
-            # Record this point in time
-            balance_records.append({
-                'customer_id': customer_id,
-                'transaction_date': row['CREATEDAT'],
-                'transaction_id': row['TRANS_ID'],
-                'transaction_type': row['TCTYPE'],
-                'amount': row['AMOUNT'],
-                'cumulative_earned': round(cumulative_earned, 2),
-                'cumulative_spent': round(cumulative_spent, 2),
-                'cumulative_expired': round(cumulative_expired, 2),
-                'current_balance': round(current_balance, 2)
-            })
+        cumulative_earned = cumulative['earned'].to_numpy()
+        cumulative_spent = cumulative['spent'].to_numpy()
+        cumulative_expired = cumulative['expired'].to_numpy()
+        current_balance = cumulative_earned - cumulative_spent - cumulative_expired
+    
+    # Every column is already a freshly computed (or sorted) array with
+    # its final dtype, so the frame takes them as they are
+    return pd.DataFrame({
+        'customer_id': history['CUSTOMERID'],
+        'transaction_date': history['CREATEDAT'],
+        'transaction_id': history['TRANS_ID'],
+        'transaction_type': tctype,
+        'amount': amount,
+        'cumulative_earned': cumulative_earned.round(2),
+        'cumulative_spent': cumulative_spent.round(2),
+        'cumulative_expired': cumulative_expired.round(2),
+        'current_balance': current_balance.round(2),
+    }, copy=False)
+
+
+@njit(cache=can_cache(__name__))
+def _running_totals(
+    customer_codes: np.ndarray,
+    type_codes: np.ndarray,
+    amounts: np.ndarray,
+    cumulative_earned: np.ndarray,
+    cumulative_spent: np.ndarray,
+    cumulative_expired: np.ndarray,
+    current_balance: np.ndarray
+) -> None:
+    """
+    Fill the running totals for rows already grouped by customer.
     
-    return pd.DataFrame(balance_records)
+    One pass, all four outputs: totals reset whenever the customer code
+    changes, earned adds the amount, spent/expired add its absolute value,
+    and other types leave the totals as they are. A NaN amount carries
+    forward, as it would in a running Python sum. Compiled with Numba
+    when it is installed (see jit.py).
+    """
+    previous_customer = -1
+    earned = spent = expired = 0.0
+    
+    for i in range(len(customer_codes)):
+        if customer_codes[i] != previous_customer:
+            previous_customer = customer_codes[i]
+            earned = spent = expired = 0.0
+        
+        if type_codes[i] == EARNED:
+            earned += amounts[i]
+        elif type_codes[i] == SPENT:
+            spent += abs(amounts[i])
+        elif type_codes[i] == EXPIRED:
+            expired += abs(amounts[i])
+        
+        cumulative_earned[i] = earned
+        cumulative_spent[i] = spent
+        cumulative_expired[i] = expired
+        current_balance[i] = earned - spent - expired
 
 
 def get_balance_on_date(
@@ -118,7 +218,8 @@ def get_balance_on_date(
     on 2023-03-21?"
     
     PARAMETERS:
-        balance_history: DataFrame from build_customer_balance_history()
+        balance_history: DataFrame from build_customer_balance_history(),
+            in the row order it returns
         customer_ids: List of customer IDs to query
         target_date: Date string in 'YYYY-MM-DD' format
     
@@ -129,16 +230,33 @@ def get_balance_on_date(
     
     target_dt = pd.to_datetime(target_date)
     
+    # build_customer_balance_history lays each customer out as one
+    # contiguous block of ascending dates (customers in first-appearance
+    # order, not sorted by ID). Find where every block starts in one O(n)
+    # pass, then binary-search the requested customers' blocks by date -
+    # no re-sort and no copy of the history frame.
+    history_customers = balance_history['customer_id'].to_numpy()
+    history_dates = balance_history['transaction_date'].to_numpy()
+    
+    new_block = np.ones(len(history_customers), dtype=bool)
+    new_block[1:] = history_customers[1:] != history_customers[:-1]
+    starts = np.flatnonzero(new_block)
+    ends = np.append(starts[1:], len(history_customers))
+    customer_blocks = dict(zip(history_customers[starts].tolist(), zip(starts, ends)))
+    
     results = []
     
     for customer_id in customer_ids:
-        # Filter to this customer's transactions on or before target date
-        customer_history = balance_history[
-            (balance_history['customer_id'] == customer_id) &
-            (balance_history['transaction_date'] <= target_dt)
-        ]
+        # Customers with no history get an empty block
+        start, end = customer_blocks.get(customer_id, (0, 0))
+        
+        # Last of this customer's transactions on or before the target
+        # date (missing dates sort last and never count)
+        latest_pos = start + np.searchsorted(
+            history_dates[start:end], np.datetime64(target_dt), side='right'
+        ) - 1
         
-        if len(customer_history) == 0:
+        if latest_pos < start:
             # No transactions before target date
             results.append({
                 'customer_id': customer_id,
@@ -151,7 +269,7 @@ def get_balance_on_date(
             })
         else:
             # Get the most recent transaction
-            latest = customer_history.iloc[-1]
+            latest = balance_history.iloc[latest_pos]
             
             results.append({
                 'customer_id': customer_id,
@@ -178,8 +296,7 @@ def run_analytics():
     
     # Load the FIFO-matched data
     logger.info("Loading FIFO-matched data...")
-    df = pd.read_csv('output/tc_data_with_redemptions.csv')
-    df['CREATEDAT'] = pd.to_datetime(df['CREATEDAT'])
+    df = load_matched_data()
     
     print(f"\nLoaded {len(df)} transactions for {df['CUSTOMERID'].nunique()} customers")
     
@@ -229,8 +346,17 @@ def run_analytics():
     print("SUMMARY STATISTICS")
     print("=" * 70)
     
-    # Current balances (latest for each customer)
-    current_balances = balance_history.groupby('customer_id').last().reset_index()
+    # Current balances (latest for each customer). Each customer's rows
+    # are contiguous and in date order, so the latest row is wherever the
+    # next row belongs to another customer - no grouping needed.
+    history_customers = balance_history['customer_id'].to_numpy()
+    is_last = np.ones(len(history_customers), dtype=bool)
+    is_last[:-1] = history_customers[1:] != history_customers[:-1]
+    current_balances = (
+        balance_history[is_last]
+        .sort_values('customer_id')
+        .reset_index(drop=True)
+    )
     
     print("\nCurrent Customer Balances:")
     print(current_balances[[
@@ -238,10 +364,15 @@ def run_analytics():
         'cumulative_expired', 'current_balance'
     ]].to_string(index=False))
     
-    # Overall totals
-    total_earned = df[df['TCTYPE'] == 'earned']['AMOUNT'].sum()
-    total_spent = abs(df[df['TCTYPE'] == 'spent']['AMOUNT'].sum())
-    total_expired = abs(df[df['TCTYPE'] == 'expired']['AMOUNT'].sum())
+    # Overall totals: AMOUNT summed per type code in one pass instead of
+    # one string filter per type (missing amounts count as 0, as in sum())
+    type_codes = transaction_type_codes(df['TCTYPE'])
+    known_type = type_codes >= 0
+    amount = np.nan_to_num(df['AMOUNT'].to_numpy(dtype=np.float64, na_value=np.nan))
+    totals = np.bincount(type_codes[known_type], weights=amount[known_type], minlength=3)
+    total_earned = totals[EARNED]
+    total_spent = abs(totals[SPENT])
+    total_expired = abs(totals[EXPIRED])
     total_liability = total_earned - total_spent - total_expired
     
     print(f"\nOverall Thrive Cash Metrics:")
@@ -34,15 +34,23 @@ DATE: 2024
 import pytest
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import sys
 import os
+import time
 
 # Add src directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from fifo_matching import perform_fifo_matching, load_tc_data
-from data_quality import validate_source_data, validate_fifo_results
+from fifo_matching import (
+    perform_fifo_matching, perform_fifo_matching_with_stats, load_tc_data,
+    iter_sheet_chunks, save_results, convert_xlsx_to_parquet,
+    tc_data_arrow_schema, write_parquet_chunks
+)
+from data_quality import (
+    validate_source_data, validate_source_data_lazy, validate_fifo_results
+)
+from run_analytics import build_customer_balance_history, get_balance_on_date, load_matched_data
 
 
 # =============================================================================
@@ -50,7 +58,7 @@ from data_quality import validate_source_data, validate_fifo_results
 # =============================================================================
 # Fixtures provide reusable test data. They run before each test that uses them.
 
-@pytest.fixture
+@pytest.fixture(scope='module')
 def sample_tc_data():
     """
     Create a sample DataFrame that mimics the TC_Data structure.
@@ -58,6 +66,8 @@ def sample_tc_data():
     WHAT THIS IS:
         A small, controlled dataset for testing. We know exactly what
         the expected output should be, so we can verify the algorithm.
+        Built once per module and shared, so tests must not modify it
+        (take a .copy() first).
     
     SCENARIO:
         Customer 1: Earns $20, then $30, then spends $25
@@ -84,6 +94,26 @@ def sample_tc_data():
     return pd.DataFrame(data)
 
 
+@pytest.fixture(scope='module')
+def sample_matched(sample_tc_data):
+    """
+    FIFO matching result for sample_tc_data, computed once per module.
+    
+    Shared by every test that only reads the matched frame; tests that
+    modify it must take a .copy() first.
+    """
+    return perform_fifo_matching(sample_tc_data)
+
+
+@pytest.fixture(scope='module')
+def sample_source_report(sample_tc_data):
+    """
+    validate_source_data() report for sample_tc_data, computed once per
+    module. ValidationReport is frozen, so sharing it is safe.
+    """
+    return validate_source_data(sample_tc_data)
+
+
 @pytest.fixture
 def multi_customer_data():
     """
@@ -150,6 +180,37 @@ def expired_transactions_data():
     return pd.DataFrame(data)
 
 
+@pytest.fixture(scope='session')
+def actual_tc_data():
+    """
+    The real TC_Data sheet from data/tc_raw_data.xlsx, loaded once.
+    
+    WHAT THIS IS:
+        Shared by the integration tests so the workbook is parsed once per
+        test session. Tests that need it are skipped when the file is not
+        there. Tests must not modify it (take a .copy() first).
+    """
+    try:
+        return load_tc_data('data/tc_raw_data.xlsx')
+    except FileNotFoundError:
+        pytest.skip("Data file not found - skipping integration test")
+
+
+@pytest.fixture
+def by_trans_id():
+    """
+    Index a result DataFrame by TRANS_ID for single-row lookups.
+    
+    WHAT THIS IS:
+        A helper: by_trans_id(result)[1001] is the row of transaction
+        1001 as a dict. The index is built once per result, so each
+        lookup is a dict access instead of a scan of the whole frame.
+    """
+    def _make(df):
+        return df.set_index('TRANS_ID', drop=False).to_dict('index')
+    return _make
+
+
 # =============================================================================
 # BASIC FUNCTIONALITY TESTS
 # =============================================================================
@@ -162,7 +223,7 @@ class TestBasicFIFOMatching:
     in straightforward scenarios.
     """
     
-    def test_simple_fifo_matching(self, sample_tc_data):
+    def test_simple_fifo_matching(self, sample_matched, by_trans_id):
         """
         Test that FIFO matching assigns REDEEMID correctly.
         
@@ -172,28 +233,28 @@ class TestBasicFIFOMatching:
         EXPECTED:
             The $20 earned (oldest) should get REDEEMID = 1003 (the spent transaction)
         """
-        result = perform_fifo_matching(sample_tc_data)
+        result = sample_matched
         
         # Check that REDEEMID column was added
         assert 'REDEEMID' in result.columns, "REDEEMID column should be added"
+        assert result['REDEEMID'].dtype == 'Int64', "REDEEMID should be nullable Int64"
         
         # Check that the oldest earned transaction got matched
-        earned_1001 = result[result['TRANS_ID'] == 1001].iloc[0]
-        assert earned_1001['REDEEMID'] == 1003, \
+        assert by_trans_id(result)[1001]['REDEEMID'] == 1003, \
             "Oldest earned (1001) should be matched to spent (1003)"
     
-    def test_fifo_order_respected(self, sample_tc_data):
+    def test_fifo_order_respected(self, sample_matched, by_trans_id):
         """
         Test that FIFO order is respected (oldest earned matched first).
         
         EXPECTED:
             Transaction 1001 (older) should be matched before 1002 (newer)
         """
-        result = perform_fifo_matching(sample_tc_data)
+        rows = by_trans_id(sample_matched)
         
         # Get the earned transactions
-        earned_1001 = result[result['TRANS_ID'] == 1001].iloc[0]
-        earned_1002 = result[result['TRANS_ID'] == 1002].iloc[0]
+        earned_1001 = rows[1001]
+        earned_1002 = rows[1002]
         
         # 1001 should be matched (has REDEEMID)
         assert pd.notna(earned_1001['REDEEMID']), \
@@ -202,20 +263,32 @@ class TestBasicFIFOMatching:
         # 1002 might or might not be matched depending on amounts
         # In this case, $25 spent > $20 earned, so 1002 should also be partially matched
     
-    def test_redeemid_only_on_earned(self, sample_tc_data):
+    def test_redeemid_only_on_earned(self, sample_matched):
         """
         Test that REDEEMID is only assigned to earned transactions.
         
         EXPECTED:
             Spent and expired transactions should NOT have REDEEMID values
         """
-        result = perform_fifo_matching(sample_tc_data)
+        result = sample_matched
         
         # Check spent transaction doesn't have REDEEMID
         spent_row = result[result['TCTYPE'] == 'spent'].iloc[0]
         assert pd.isna(spent_row['REDEEMID']), \
             "Spent transactions should not have REDEEMID"
 
+    def test_stats_match_result(self, multi_customer_data):
+        """
+        Test that the statistics counted during matching agree with a
+        scan of the result.
+        """
+        result, stats = perform_fifo_matching_with_stats(multi_customer_data)
+        
+        earned = result[result['TCTYPE'] == 'earned']
+        assert stats['total_transactions'] == len(result)
+        assert stats['total_earned'] == len(earned)
+        assert stats['matched_earned'] == earned['REDEEMID'].notna().sum()
+
 
 class TestMultiCustomerMatching:
     """
@@ -243,13 +316,13 @@ class TestMultiCustomerMatching:
         ]
         
         # Check that their REDEEMIDs reference Customer 100's spent transactions
-        customer_100_spent_ids = set(
-            result[(result['CUSTOMERID'] == 100) & (result['TCTYPE'] == 'spent')]['TRANS_ID']
-        )
+        customer_100_spent_ids = result.loc[
+            (result['CUSTOMERID'] == 100) & (result['TCTYPE'] == 'spent'), 'TRANS_ID'
+        ].to_numpy()
         
-        for _, row in customer_100_earned.iterrows():
-            assert row['REDEEMID'] in customer_100_spent_ids, \
-                f"Customer 100's earned should only match to Customer 100's spent"
+        assert np.isin(customer_100_earned['REDEEMID'].to_numpy(dtype=np.int64),
+                       customer_100_spent_ids).all(), \
+            f"Customer 100's earned should only match to Customer 100's spent"
     
     def test_no_cross_customer_matching(self, multi_customer_data):
         """
@@ -262,19 +335,19 @@ class TestMultiCustomerMatching:
         result = perform_fifo_matching(multi_customer_data)
         
         # Get all REDEEMIDs for Customer 100
-        customer_100_redeemids = set(
-            result[result['CUSTOMERID'] == 100]['REDEEMID'].dropna()
-        )
+        customer_100_redeemids = result.loc[
+            result['CUSTOMERID'] == 100, 'REDEEMID'
+        ].dropna().to_numpy(dtype=np.int64)
         
         # Get Customer 200's spent transaction IDs
-        customer_200_spent_ids = set(
-            result[(result['CUSTOMERID'] == 200) & (result['TCTYPE'] == 'spent')]['TRANS_ID']
-        )
+        customer_200_spent_ids = result.loc[
+            (result['CUSTOMERID'] == 200) & (result['TCTYPE'] == 'spent'), 'TRANS_ID'
+        ].to_numpy()
         
         # There should be no overlap
-        overlap = customer_100_redeemids & customer_200_spent_ids
-        assert len(overlap) == 0, \
-            f"Found cross-customer matching: {overlap}"
+        overlap = np.isin(customer_100_redeemids, customer_200_spent_ids)
+        assert not overlap.any(), \
+            f"Found cross-customer matching: {customer_100_redeemids[overlap]}"
 
 
 class TestExpiredTransactions:
@@ -305,6 +378,36 @@ class TestExpiredTransactions:
             "Expired transaction should be matched to an earned transaction"
 
 
+class TestSQLReferenceQuery:
+    """
+    Tests that the DuckDB reference query in sql/ follows the same FIFO
+    rules as perform_fifo_matching.
+    """
+    
+    def test_sql_reference_query_matches_pandas(self, multi_customer_data, expired_transactions_data):
+        """
+        Test that the DuckDB reference query in sql/ assigns the same
+        REDEEMIDs as perform_fifo_matching.
+        """
+        duckdb = pytest.importorskip('duckdb')
+        
+        sql_path = os.path.join(os.path.dirname(__file__), '..', 'sql', 'fifo_matching_duckdb.sql')
+        with open(sql_path) as f:
+            query = f.read()
+        
+        for df in (multi_customer_data, expired_transactions_data):
+            conn = duckdb.connect()
+            conn.register('source_df', df)
+            conn.execute("CREATE TABLE tc_data AS SELECT * FROM source_df")
+            
+            sql_result = conn.sql(query).df()
+            pandas_result = perform_fifo_matching(df)
+            
+            assert sql_result['TRANS_ID'].tolist() == pandas_result['TRANS_ID'].tolist()
+            assert sql_result['REDEEMID'].fillna(-1).tolist() == \
+                   pandas_result['REDEEMID'].fillna(-1).tolist()
+
+
 # =============================================================================
 # EDGE CASE TESTS
 # =============================================================================
@@ -381,7 +484,7 @@ class TestEdgeCases:
         # Should complete without error
         assert 'REDEEMID' in result.columns
     
-    def test_spent_before_earned(self):
+    def test_spent_before_earned(self, by_trans_id):
         """
         Test when spent transaction occurs before any earned.
         
@@ -408,8 +511,7 @@ class TestEdgeCases:
         
         # The earned transaction should NOT be matched to the spent
         # because the spent happened before the earned
-        earned_row = result[result['TRANS_ID'] == 1002].iloc[0]
-        assert pd.isna(earned_row['REDEEMID']), \
+        assert pd.isna(by_trans_id(result)[1002]['REDEEMID']), \
             "Earned after spent should not be matched to that spent"
 
 
@@ -424,11 +526,11 @@ class TestDataQualityValidation:
     These tests ensure our validation checks catch data issues correctly.
     """
     
-    def test_source_validation_passes_good_data(self, sample_tc_data):
+    def test_source_validation_passes_good_data(self, sample_source_report):
         """
         Test that valid data passes source validation.
         """
-        report = validate_source_data(sample_tc_data)
+        report = sample_source_report
         
         assert report.passed, \
             f"Valid data should pass validation. Errors: {report.error_count}"
@@ -484,17 +586,205 @@ class TestDataQualityValidation:
         )
         assert type_check is not None and not type_check.passed, \
             "Should catch invalid transaction type"
+        
+        # The sign check depends on valid types, so it is skipped, not run
+        sign_check = next(r for r in report.results if r.check_name == "Amount Sign Consistency")
+        assert sign_check.severity == 'INFO' and sign_check.message.startswith("Skipped")
+    
+    def test_source_validation_stops_on_missing_columns(self, sample_tc_data):
+        """
+        Test that missing required columns give one error and no other checks.
+        """
+        report = validate_source_data(sample_tc_data.drop(columns=['AMOUNT']))
+        
+        assert not report.passed
+        assert [r.check_name for r in report.results] == ["Required Columns Present"]
+        assert report.results[0].details['missing_columns'] == ['AMOUNT']
     
-    def test_fifo_validation_passes_correct_results(self, sample_tc_data):
+    def test_lazy_source_validation_matches_eager(self, sample_tc_data):
+        """
+        Test that the polars LazyFrame validator reports the same checks
+        as the pandas one, including on data with duplicates and bad types.
+        """
+        pl = pytest.importorskip('polars')
+        
+        bad_data = pd.concat([sample_tc_data, sample_tc_data.iloc[:1]], ignore_index=True)
+        bad_data.loc[len(bad_data) - 1, 'TCTYPE'] = 'invalid_type'
+        
+        for df in (sample_tc_data, bad_data):
+            eager = validate_source_data(df)
+            lazy = validate_source_data_lazy(pl.from_pandas(df).lazy())
+            
+            assert [(r.check_name, r.passed, r.message, r.details) for r in lazy.results] == \
+                   [(r.check_name, r.passed, r.message, r.details) for r in eager.results]
+    
+    def test_fifo_validation_passes_correct_results(self, sample_tc_data, sample_matched):
         """
         Test that correctly matched data passes FIFO validation.
         """
-        matched_df = perform_fifo_matching(sample_tc_data)
-        report = validate_fifo_results(sample_tc_data, matched_df)
+        report = validate_fifo_results(sample_tc_data, sample_matched)
         
         assert report.passed, \
             f"Correctly matched data should pass validation. Errors: {report.error_count}"
 
+    def test_fifo_validation_catches_redemption_before_earned(self, sample_tc_data, sample_matched):
+        """
+        Test that an earned transaction matched to an earlier redemption
+        is reported as a chronological error.
+        """
+        matched_df = sample_matched.copy()
+        # Move the matched earned 1001 after its redemption 1003
+        matched_df.loc[matched_df['TRANS_ID'] == 1001, 'CREATEDAT'] = datetime(2023, 12, 31)
+        
+        report = validate_fifo_results(sample_tc_data, matched_df)
+        
+        chrono_check = next(r for r in report.results if r.check_name == "Chronological Consistency")
+        assert not chrono_check.passed
+        assert [e['earned_id'] for e in chrono_check.details['errors']] == [1001]
+        assert chrono_check.details['errors'][0]['redemption_id'] == 1003
+
+
+# =============================================================================
+# DATA LOADING & STAGING TESTS
+# =============================================================================
+
+class TestLoadingAndStaging:
+    """
+    Tests for reading TC_Data and staging it as parquet.
+    
+    These cover the loader and the streaming reader/writer helpers on
+    small files written to tmp_path.
+    """
+    
+    def test_load_staged_parquet(self, sample_tc_data, tmp_path):
+        """
+        Test that load_tc_data reads a staged parquet copy of TC_Data.
+        """
+        parquet_path = str(tmp_path / 'TC_Data.parquet')
+        sample_tc_data.to_parquet(parquet_path, index=False)
+
+        df = load_tc_data(parquet_path)
+
+        assert len(df) == len(sample_tc_data)
+        assert list(df['TRANS_ID']) == list(sample_tc_data['TRANS_ID'])
+        assert pd.api.types.is_datetime64_any_dtype(df['CREATEDAT'])
+    
+    def test_load_prefers_converted_parquet(self, tmp_path):
+        """
+        Test that once a workbook is converted, loading the .xlsx path
+        reads the parquet copy and returns the same data.
+        """
+        import shutil
+        
+        source = 'data/tc_raw_data.xlsx'
+        if not os.path.exists(source):
+            pytest.skip("Actual data file not found")
+        
+        workbook = str(tmp_path / 'tc_raw_data.xlsx')
+        shutil.copy(source, workbook)
+        from_excel = load_tc_data(workbook)
+        
+        parquet_path = convert_xlsx_to_parquet(workbook)
+        assert parquet_path == str(tmp_path / 'tc_raw_data.parquet')
+        
+        from_parquet = load_tc_data(workbook)
+        pd.testing.assert_frame_equal(from_parquet, from_excel)
+    
+    def test_iter_sheet_chunks_header_only(self, tmp_path):
+        """
+        Test that a sheet with a header but no data rows still yields the
+        columns, so the staged parquet keeps its schema.
+        """
+        workbook = str(tmp_path / 'header_only.xlsx')
+        pd.DataFrame(columns=['TRANS_ID', 'TCTYPE', 'AMOUNT']).to_excel(
+            workbook, sheet_name='TC_Data', index=False
+        )
+        
+        chunks = list(iter_sheet_chunks(workbook, 'TC_Data',
+                                        dtype={'AMOUNT': 'float64'}))
+        
+        assert len(chunks) == 1
+        assert chunks[0].empty
+        assert list(chunks[0].columns) == ['TRANS_ID', 'TCTYPE', 'AMOUNT']
+        assert chunks[0]['AMOUNT'].dtype == 'float64'
+    
+    def test_write_parquet_chunks_column_empty_in_first_chunk(self, tmp_path):
+        """
+        Test that streaming a sheet whose first chunk has only earned rows
+        (no ORDERID, REASON or EXPIREDAT values) still writes every chunk
+        with the TC_Data column types.
+        """
+        workbook = str(tmp_path / 'earned_first.xlsx')
+        pd.DataFrame({
+            'TRANS_ID': [1, 2, 3, 4],
+            'TCTYPE': ['earned', 'earned', 'spent', 'expired'],
+            'CREATEDAT': pd.to_datetime(['2023-01-01', '2023-01-02',
+                                         '2023-01-03', '2023-01-04']),
+            'EXPIREDAT': [None, None, None, datetime(2023, 6, 1)],
+            'CUSTOMERID': [100, 100, 100, 100],
+            'ORDERID': [None, None, 5001, None],
+            'AMOUNT': [10.0, 20.0, -15.0, -5.0],
+            'REASON': [None, None, 'Order', 'Expiry'],
+        }).to_excel(workbook, sheet_name='TC_Data', index=False)
+        output_path = str(tmp_path / 'TC_Data.parquet')
+        
+        chunks = iter_sheet_chunks(workbook, 'TC_Data', chunk_size=2,
+                                   dtype={'AMOUNT': 'float64', 'TCTYPE': 'category'})
+        rows = write_parquet_chunks(chunks, output_path,
+                                    schema=tc_data_arrow_schema())
+        staged = pd.read_parquet(output_path)
+        
+        assert rows == 4
+        assert not os.path.exists(output_path + '.tmp')
+        assert staged['ORDERID'].tolist()[2] == 5001
+        assert staged['REASON'].tolist()[2:] == ['Order', 'Expiry']
+        assert pd.api.types.is_datetime64_any_dtype(staged['EXPIREDAT'])
+        assert isinstance(staged['TCTYPE'].dtype, pd.CategoricalDtype)
+
+
+# =============================================================================
+# ANALYTICS TESTS
+# =============================================================================
+
+class TestRunAnalytics:
+    """
+    Tests for the balance calculations in run_analytics.
+    
+    These run on small synthetic frames, not the actual data file.
+    """
+    
+    def test_balance_history_running_totals(self, multi_customer_data):
+        """
+        Test that balance history keeps customers in first-seen order,
+        each customer's rows by date, with correct running totals.
+        """
+        history = build_customer_balance_history(multi_customer_data)
+        
+        # 1001 and 2003 share a timestamp; input order breaks the tie
+        assert list(history['transaction_id']) == [1001, 2003, 1002, 1003, 2001, 2002]
+        customer_100 = history[history['customer_id'] == 100]
+        assert list(customer_100['current_balance']) == [20.0, 30.0, 15.0]
+        assert list(customer_100['cumulative_spent']) == [0.0, 0.0, 15.0]
+    
+    def test_balance_on_date_customers_out_of_id_order(self):
+        """
+        Test that balances are looked up correctly when the history lists
+        customers in first-appearance order rather than by ID.
+        """
+        df = pd.DataFrame({
+            'TRANS_ID': [1, 2, 3, 4],
+            'TCTYPE': ['earned', 'earned', 'spent', 'earned'],
+            'CREATEDAT': pd.to_datetime(['2023-03-01', '2023-02-01',
+                                         '2023-03-10', '2023-03-25']),
+            'CUSTOMERID': [200, 100, 200, 100],
+            'AMOUNT': [10.0, 5.0, -3.0, 7.0],
+        })
+        history = build_customer_balance_history(df)
+        
+        balances = get_balance_on_date(history, [100, 200, 999], '2023-03-21')
+        
+        assert list(balances['balance_on_date']) == [5.0, 7.0, 0]
+
 
 # =============================================================================
 # INTEGRATION TESTS
@@ -507,46 +797,116 @@ class TestIntegration:
     These tests use the actual data file to verify end-to-end functionality.
     """
     
-    def test_load_actual_data(self):
+    def test_load_actual_data(self, actual_tc_data):
         """
         Test loading the actual Excel file.
         """
-        # This test requires the actual data file
-        try:
-            df = load_tc_data('data/tc_raw_data.xlsx')
-            
-            assert len(df) > 0, "Should load some data"
-            assert 'TRANS_ID' in df.columns
-            assert 'TCTYPE' in df.columns
-            assert 'CUSTOMERID' in df.columns
-        except FileNotFoundError:
-            pytest.skip("Data file not found - skipping integration test")
+        df = actual_tc_data
+        
+        assert len(df) > 0, "Should load some data"
+        assert 'TRANS_ID' in df.columns
+        assert 'TCTYPE' in df.columns
+        assert 'CUSTOMERID' in df.columns
+
+    def test_import_as_package_from_repo_root(self):
+        """
+        Test that the modules also import as the src package, the way the
+        run_fifo_matching_pipeline docstring shows. Runs in a fresh
+        interpreter from the repo root, where only the package path works.
+        """
+        import subprocess
+        
+        repo_root = os.path.join(os.path.dirname(__file__), '..')
+        completed = subprocess.run(
+            [sys.executable, '-c',
+             'from src.fifo_matching import run_fifo_matching_pipeline\n'
+             'from src.run_analytics import build_customer_balance_history\n'
+             'from src.data_quality import validate_source_data'],
+            cwd=repo_root, capture_output=True, text=True
+        )
+        
+        assert completed.returncode == 0, completed.stderr
     
-    def test_full_pipeline_on_actual_data(self):
+    def test_save_results_feather_round_trip(self, sample_matched, tmp_path):
+        """
+        Test that results saved as feather read back with their dtypes.
+        """
+        from pyarrow import feather
+        
+        output_path = str(tmp_path / 'results.feather')
+        save_results(sample_matched, output_path)
+        
+        df = feather.read_table(output_path, columns=['TRANS_ID', 'CREATEDAT', 'REDEEMID'],
+                                memory_map=True).to_pandas()
+        
+        assert list(df.columns) == ['TRANS_ID', 'CREATEDAT', 'REDEEMID']
+        assert pd.api.types.is_datetime64_any_dtype(df['CREATEDAT'])
+        assert df.loc[df['TRANS_ID'] == 1001, 'REDEEMID'].iloc[0] == 1003
+
+    def test_load_matched_data_parquet_only(self, sample_matched, tmp_path):
+        """
+        Test that the default CSV path reads the parquet copy when results
+        were only ever saved as parquet.
+        """
+        csv_path = str(tmp_path / 'tc_data_with_redemptions.csv')
+        save_results(sample_matched, str(tmp_path / 'tc_data_with_redemptions.parquet'))
+        
+        df = load_matched_data(csv_path)
+        
+        assert not os.path.exists(csv_path)
+        assert list(df['TRANS_ID']) == list(sample_matched['TRANS_ID'])
+        assert pd.api.types.is_datetime64_any_dtype(df['CREATEDAT'])
+
+    def test_load_tc_data_rereads_rewritten_file(self, sample_tc_data, tmp_path):
+        """
+        Test that loading a file again after it is rewritten returns the
+        new contents.
+        """
+        parquet_path = str(tmp_path / 'TC_Data.parquet')
+        sample_tc_data.to_parquet(parquet_path, index=False)
+        assert len(load_tc_data(parquet_path)) == len(sample_tc_data)
+        
+        sample_tc_data.head(2).to_parquet(parquet_path, index=False)
+        assert len(load_tc_data(parquet_path)) == 2
+
+    def test_streamed_sheet_matches_read_excel(self):
+        """
+        Test that streaming TC_Data in small chunks gives the same rows as
+        a normal pd.read_excel of the sheet.
+        """
+        source = 'data/tc_raw_data.xlsx'
+        if not os.path.exists(source):
+            pytest.skip("Actual data file not found")
+        
+        chunks = list(iter_sheet_chunks(source, 'TC_Data', chunk_size=5))
+        streamed = pd.concat(chunks, ignore_index=True)
+        expected = pd.read_excel(source, sheet_name='TC_Data', engine='openpyxl')
+        
+        assert all(len(chunk) <= 5 for chunk in chunks)
+        assert list(streamed.columns) == list(expected.columns)
+        assert list(streamed['TRANS_ID']) == list(expected['TRANS_ID'])
+        assert streamed['AMOUNT'].sum() == pytest.approx(expected['AMOUNT'].sum())
+
+    def test_full_pipeline_on_actual_data(self, actual_tc_data):
         """
         Test the full FIFO matching pipeline on actual data.
         """
-        try:
-            # Load data
-            df = load_tc_data('data/tc_raw_data.xlsx')
-            
-            # Validate source
-            source_report = validate_source_data(df)
-            assert source_report.passed, "Source validation should pass"
-            
-            # Perform matching
-            matched_df = perform_fifo_matching(df)
-            
-            # Validate results
-            fifo_report = validate_fifo_results(df, matched_df)
-            assert fifo_report.passed, "FIFO validation should pass"
-            
-            # Check output has expected structure
-            assert 'REDEEMID' in matched_df.columns
-            assert len(matched_df) == len(df)
-            
-        except FileNotFoundError:
-            pytest.skip("Data file not found - skipping integration test")
+        df = actual_tc_data
+        
+        # Validate source
+        source_report = validate_source_data(df)
+        assert source_report.passed, "Source validation should pass"
+        
+        # Perform matching
+        matched_df = perform_fifo_matching(df)
+        
+        # Validate results
+        fifo_report = validate_fifo_results(df, matched_df)
+        assert fifo_report.passed, "FIFO validation should pass"
+        
+        # Check output has expected structure
+        assert 'REDEEMID' in matched_df.columns
+        assert len(matched_df) == len(df)
 
 
 # =============================================================================
@@ -561,45 +921,58 @@ class TestPerformance:
     within acceptable time limits.
     """
     
-    def test_handles_large_dataset(self):
+    # pytest-timeout is only a hang guard: the signal method fails this one
+    # test at the deadline (the thread method would end the whole session),
+    # and 60s leaves room for a cold Numba compile on a loaded CI box. The
+    # 5-second budget itself is asserted on the timed, warmed-up run below.
+    # Without the plugin there is no hang guard, so the test is skipped.
+    @pytest.mark.timeout(60, method='signal')
+    def test_handles_large_dataset(self, request):
         """
         Test that the algorithm can handle a larger dataset.
         
-        Creates 1000 transactions and verifies completion within 5 seconds.
+        Creates 1000 transactions and verifies matching completes within
+        5 seconds once the kernel is compiled.
         """
-        import time
+        if not request.config.pluginmanager.hasplugin('timeout'):
+            pytest.skip("pytest-timeout not installed")
         
         # Generate larger dataset
         n_transactions = 1000
         n_customers = 50
         
-        np.random.seed(42)  # For reproducibility
+        rng = np.random.default_rng(42)  # For reproducibility
         
-        data = {
-            'TRANS_ID': list(range(1, n_transactions + 1)),
-            'TCTYPE': np.random.choice(['earned', 'spent', 'expired'], n_transactions, p=[0.5, 0.35, 0.15]),
-            'CREATEDAT': [datetime(2023, 1, 1) + timedelta(hours=i) for i in range(n_transactions)],
-            'EXPIREDAT': [None] * n_transactions,
-            'CUSTOMERID': np.random.choice(range(1, n_customers + 1), n_transactions),
-            'ORDERID': [None] * n_transactions,
-            'AMOUNT': [20.0 if t == 'earned' else -15.0 for t in np.random.choice(['earned', 'spent', 'expired'], n_transactions, p=[0.5, 0.35, 0.15])],
-            'REASON': [None] * n_transactions,
-        }
-        
-        # Fix amounts based on actual types
-        df = pd.DataFrame(data)
-        df.loc[df['TCTYPE'] == 'earned', 'AMOUNT'] = np.random.uniform(10, 50, (df['TCTYPE'] == 'earned').sum())
-        df.loc[df['TCTYPE'] == 'spent', 'AMOUNT'] = -np.random.uniform(5, 30, (df['TCTYPE'] == 'spent').sum())
-        df.loc[df['TCTYPE'] == 'expired', 'AMOUNT'] = -np.random.uniform(5, 20, (df['TCTYPE'] == 'expired').sum())
+        # One draw of type codes (0 = earned, 1 = spent, 2 = expired)
+        # drives both TCTYPE and the sign/range of AMOUNT
+        type_codes = rng.choice(np.array([0, 1, 2], dtype=np.int8), n_transactions, p=[0.5, 0.35, 0.15])
+        amounts = np.select(
+            [type_codes == 0, type_codes == 1],
+            [rng.uniform(10, 50, n_transactions), -rng.uniform(5, 30, n_transactions)],
+            -rng.uniform(5, 20, n_transactions)
+        )
         
-        # Time the execution
-        start_time = time.time()
+        df = pd.DataFrame({
+            'TRANS_ID': np.arange(1, n_transactions + 1),
+            'TCTYPE': np.array(['earned', 'spent', 'expired'])[type_codes],
+            # One transaction per hour from 2023-01-01
+            'CREATEDAT': np.datetime64('2023-01-01', 'ns') + np.arange(n_transactions).astype('timedelta64[h]'),
+            'EXPIREDAT': pd.NaT,
+            'CUSTOMERID': rng.integers(1, n_customers + 1, n_transactions),
+            'ORDERID': None,
+            'AMOUNT': amounts,
+            'REASON': None,
+        })
+        
+        # Warm-up on a few rows pays any one-off JIT compile cost
+        perform_fifo_matching(df.head(10))
+        
+        started = time.perf_counter()
         result = perform_fifo_matching(df)
-        elapsed_time = time.time() - start_time
+        elapsed = time.perf_counter() - started
         
-        assert elapsed_time < 5.0, \
-            f"Should complete 1000 transactions in under 5 seconds, took {elapsed_time:.2f}s"
         assert len(result) == n_transactions
+        assert elapsed < 5, f"Matching took {elapsed:.2f}s"
 
 
 # =============================================================================